@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Guard the startup cost of main.py imports.
+
+Imports the modules main.py needs under `python -X importtime`, prints the
+slowest ones and fails if the total exceeds a budget or if a heavy module,
+which only some pipelines need, is imported eagerly.
+
+Usage: python benchmarks/import_time.py [--budget-ms 1500]
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1] / 'src'
+ENTRY_MODULES = ['config', 'pipeline', 'utils.profiling']
+# Must only be imported once a configured pipeline needs them
+LAZY_MODULES = ['pandas', 'tabula', 'monobank', 'requests']
+
+LINE_RE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=1500)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    check = '; '.join([f'import {m}' for m in ENTRY_MODULES] + [
+        'import sys',
+        f'print(",".join(m for m in {LAZY_MODULES!r} if m in sys.modules))',
+    ])
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', check],
+                          cwd=SRC, capture_output=True, text=True)
+    if proc.returncode:
+        sys.exit(proc.stderr)
+
+    # Cumulative time of top-level imports (no indentation) sums up to the total
+    entries = [(int(cumulative), len(indent), name)
+               for _, cumulative, indent, name in LINE_RE.findall(proc.stderr)]
+    total_ms = sum(c for c, depth, _ in entries if depth == 1) / 1000
+    print(f'{"module":<50} {"cumulative ms":>14}')
+    for cumulative, _, name in sorted(entries, reverse=True)[:args.top]:
+        print(f'{name:<50} {cumulative / 1000:>14.1f}')
+    print(f'\nTotal: {total_ms:.1f} ms (budget {args.budget_ms:.0f} ms)')
+
+    failed = False
+    if eager := proc.stdout.strip():
+        print(f'FAIL: imported eagerly: {eager}')
+        failed = True
+    if total_ms > args.budget_ms:
+        print('FAIL: import time budget exceeded')
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""Compare PDF extraction with in-process Java (jpype) against a JVM per document.
+
+Usage: python benchmarks/pdf_extraction.py <directory with PDF statements>
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / 'src'))
+
+import tabula
+from bank_api.data_source import pdf
+
+OPTIONS = dict(pages='all', lattice=True)
+
+
+def bench(label, extract, files):
+    t0 = time.perf_counter()
+    for f in files:
+        extract(f)
+    elapsed = time.perf_counter() - t0
+    print(f'{label:<20} {len(files):>5} files {elapsed:>8.2f}s {elapsed / len(files):>8.2f}s/file')
+
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    files = sorted(Path(sys.argv[1]).rglob('*.pdf'))
+    if not files:
+        sys.exit(f'No PDF files found in {sys.argv[1]}')
+    bench('JVM per document', lambda f: tabula.read_pdf(f, force_subprocess=True, **OPTIONS), files)
+    # The first call includes JVM startup
+    bench('in-process JVM', lambda f: pdf.read_pdf(f, **OPTIONS), files)
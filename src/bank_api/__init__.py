@@ -1,18 +1,52 @@
+import importlib
+import threading
 import model.configuration as conf
-from .data_source import BankApi, mono, pumb, abank, sensebank, privatbank, millennium
-from .data_source.fs import FilesystemBankApi
+from .data_source import BankApi
+
+# Bank API modules are imported on demand: they pull in heavy dependencies
+# (pandas, tabula, monobank) that only some pipelines need.
+def _import(module: str):
+    return importlib.import_module(f'.data_source.{module}', __name__)
+
+def _filesystem(c: conf.BankApiConfiguration, engine_module: str) -> BankApi:
+    return _import('fs').FilesystemBankApi(c, _import(engine_module).Engine())
 
 def create(c: conf.BankApiConfiguration) -> BankApi:
     match c.type:
         case conf.BankApiName.MONO:
-            return mono.Api(c)
+            return _import('mono').Api(c)
         case conf.BankApiName.PUMB:
-            return FilesystemBankApi(c, pumb.Engine())
+            return _filesystem(c, 'pumb')
         case conf.BankApiName.SENSE:
-            return FilesystemBankApi(c, sensebank.Engine())
+            return _filesystem(c, 'sensebank')
         case conf.BankApiName.ABANK:
-            return FilesystemBankApi(c, abank.Engine())
+            return _filesystem(c, 'abank')
         case conf.BankApiName.PB:
-            return FilesystemBankApi(c, privatbank.Engine())
+            return _filesystem(c, 'privatbank')
         case conf.BankApiName.MILLENNIUM:
-            return FilesystemBankApi(c, millennium.Engine())
+            return _filesystem(c, 'millennium')
+
+
+class BankApiPool:
+    """Bank APIs shared by all pipelines of a process, created on first use.
+
+    Sharing keeps their clients, fetched statements and parsed documents warm.
+    An API is recreated when the configuration of its source changes.
+    """
+
+    def __init__(self):
+        self.__apis: dict[str, tuple[conf.BankApiConfiguration, BankApi]] = {}
+        self.__locks: dict[str, threading.Lock] = {}
+        self.__lock = threading.Lock()
+
+    def get(self, c: conf.BankApiConfiguration) -> BankApi:
+        # Creation may hit the network (e.g. Monobank client info), so it is
+        # guarded per source: concurrent fetches of one source create it once,
+        # while other sources are not held up.
+        with self.__lock:
+            lock = self.__locks.setdefault(c.name, threading.Lock())
+        with lock:
+            entry = self.__apis.get(c.name)
+            if entry is None or entry[0] != c:
+                entry = self.__apis[c.name] = (c, create(c))
+            return entry[1]
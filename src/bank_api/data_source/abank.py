@@ -1,24 +1,26 @@
 from .fs import FilesystemBankApiEngine
-import tabula
+from . import pdf
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
 
 class Engine(FilesystemBankApiEngine):
+    time_column = 'date'
+    time_format = '%d.%m.%Y\r%H:%M'
+
     @property
     def glob_pattern(self) -> str:
         return '*.pdf'
     
     def parse_document(self, f: Path) -> pd.DataFrame:
-        df = pd.concat(tabula.read_pdf(f, pages='all', lattice=True))
+        df = pd.concat(pdf.read_pdf(f, pages='all', lattice=True))
         df.rename(inplace=True, columns={'Дата і час\rоперації': 'date', 'Деталі операції': 'description', 'МСС': 'mcc', 'Сума у валюті\rкарти (UAH)': 'amount_uah'})
         df['amount_uah'] = df['amount_uah'].str.replace(' ', '').str.replace(',', '.').astype(float)
         return df
 
-    def parse_row(self, row: pd.Series) -> dict:
-        return {
-            'time': datetime.strptime(row.date, '%d.%m.%Y\r%H:%M'),
-            'amount': int(row.amount_uah * 100),
-            'description': row.description,
-            'mcc': row.mcc
-        }
+    def to_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        return pd.DataFrame({
+            'time': pd.to_datetime(df.date, format=self.time_format),
+            'amount': (df.amount_uah * 100).astype(int),
+            'description': df.description,
+            'mcc': df.mcc,
+        })
@@ -2,11 +2,24 @@ from . import BankApi, BankTransaction, UnknownIban
 from model.configuration import BankApiConfiguration
 from pathlib import Path
 import pandas as pd
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from collections.abc import Iterable
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import OrderedDict
+import multiprocessing
+import threading
+from utils import profiling
+from .parse_cache import ParsedDocumentCache
 
 class FilesystemBankApiEngine(ABC):
+    # Bump when parse_document output changes, to invalidate cached documents
+    version = 1
+    # Column of parse_document output with operation time, and its strptime format
+    # (None if the column is already datetime). Used to index periods of documents.
+    time_column: str | None = None
+    time_format: str | None = None
+
     @property
     @abstractmethod
     def glob_pattern(self) -> str:
@@ -17,32 +30,168 @@ class FilesystemBankApiEngine(ABC):
         pass
     
     @abstractmethod
-    def parse_row(self, row: pd.Series) -> dict:
+    def to_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Convert a post-processed DataFrame to normalized columns:
+        `time` (naive local datetime), `amount` (minor units) and optionally
+        `description`, `mcc`, `comment`, using vectorized operations."""
         pass
 
     def post_process(self, df: pd.DataFrame) -> pd.DataFrame:
         return df
 
+    def document_period(self, f: Path) -> tuple[date, date] | None:
+        """Dates covered by a document, if known without parsing it (e.g. from its name)."""
+        return None
+
+    def times(self, df: pd.DataFrame) -> pd.Series | None:
+        """Operation times of a parsed document."""
+        if self.time_column is None:
+            return None
+        if self.time_format is None:
+            return df[self.time_column]
+        return pd.to_datetime(df[self.time_column], format=self.time_format, errors='coerce')
+
 class FilesystemBankApi(BankApi):
+    # Parsed documents kept in memory; least recently used ones are dropped first
+    MEMO_SIZE = 256
+
     def __init__(self, conf: BankApiConfiguration, engine: FilesystemBankApiEngine):
         self.conf = conf
         self.accounts = { a.iban: a for a in conf.accounts if a.iban }
         self.engine = engine
-    
+        self.cache = ParsedDocumentCache(conf.cache_dir, engine) if conf.cache_dir else None
+        # Documents parsed by this process: path -> (mtime, size, df)
+        self.memo: OrderedDict[Path, tuple[float, int, pd.DataFrame]] = OrderedDict()
+        # Documents being parsed by some run: path -> future of the df
+        self.__parsing: dict[Path, Future] = {}
+        self.__memo_lock = threading.Lock()
+
+    def __memo_hit(self, f: Path, stat) -> pd.DataFrame | None:
+        entry = self.memo.get(f)
+        if entry and entry[:2] == (stat.st_mtime, stat.st_size):
+            self.memo.move_to_end(f)
+            return entry[2]
+        return None
+
+    def _memoized(self, f: Path) -> pd.DataFrame | None:
+        stat = f.stat()
+        with self.__memo_lock:
+            df = self.__memo_hit(f, stat)
+        if df is not None:
+            return df
+        return self.cache.get(f) if self.cache else None
+
+    def _memoize(self, f: Path, df: pd.DataFrame):
+        stat = f.stat()
+        with self.__memo_lock:
+            self.memo[f] = (stat.st_mtime, stat.st_size, df)
+            self.memo.move_to_end(f)
+            while len(self.memo) > self.MEMO_SIZE:
+                self.memo.popitem(last=False)
+
+    def _forget_missing(self, directory: Path, files: list[Path]):
+        """Drop memoized documents of `directory` that are no longer among `files`."""
+        present = set(files)
+        with self.__memo_lock:
+            for f in [f for f in self.memo if f.is_relative_to(directory) and f not in present]:
+                del self.memo[f]
+
+    def _parse_documents(self, files: list[Path]) -> list[pd.DataFrame]:
+        """Parse documents (or take them from memo or cache), keeping the order of `files`.
+        With `parse_workers` > 1 the documents are spread over a process pool.
+        A document that another run is parsing already is waited for, not parsed again."""
+        parsed = {f: self._memoized(f) for f in files}
+        stats = {f: f.stat() for f in files if parsed[f] is None}
+        own: dict[Path, Future] = {}
+        waiting: dict[Path, Future] = {}
+        with self.__memo_lock:
+            for f in stats:
+                # Another run may have finished it since the lookup above
+                parsed[f] = self.__memo_hit(f, stats[f])
+                if parsed[f] is not None:
+                    continue
+                if f in self.__parsing:
+                    waiting[f] = self.__parsing[f]
+                else:
+                    own[f] = self.__parsing[f] = Future()
+        missing = list(own)
+        try:
+            with profiling.timed('parse', self.conf.name):
+                if self.conf.parse_workers > 1 and len(missing) > 1:
+                    # Spawn rather than fork: this process may already run the JVM used by tabula
+                    with ProcessPoolExecutor(max_workers=min(self.conf.parse_workers, len(missing)),
+                                             mp_context=multiprocessing.get_context('spawn')) as executor:
+                        dfs = list(executor.map(self.engine.parse_document, missing))
+                else:
+                    dfs = [self.engine.parse_document(f) for f in missing]
+            for f, df in zip(missing, dfs):
+                parsed[f] = df
+                if self.cache:
+                    self.cache.put(f, df)
+                self._memoize(f, df)
+                own[f].set_result(df)
+        except BaseException as e:
+            for future in own.values():
+                if not future.done():
+                    future.set_exception(e)
+            raise
+        finally:
+            with self.__memo_lock:
+                for f in own:
+                    del self.__parsing[f]
+        for f, future in waiting.items():
+            parsed[f] = future.result()
+        for f in files:
+            self._memoize(f, parsed[f])
+        if self.cache:
+            for f in files:
+                if self.cache.get_period(f) is None:
+                    self._index_period(f, parsed[f])
+        return [parsed[f] for f in files]
+
+    def _index_period(self, f: Path, df: pd.DataFrame):
+        times = self.engine.times(df)
+        if times is not None:
+            times = times.dropna()
+            if len(times):
+                self.cache.put_period(f, times.min().date(), times.max().date())
+
+    def _period(self, f: Path) -> tuple[date, date] | None:
+        return self.engine.document_period(f) or (self.cache.get_period(f) if self.cache else None)
+
+    def _select_documents(self, files: list[Path], start: datetime, end: datetime) -> list[Path]:
+        """Skip documents whose known period is outside [start, end].
+        Document times are local and naive, so allow a day of slack on each side."""
+        first, last = start.date() - timedelta(days=1), end.date() + timedelta(days=1)
+        selected = []
+        for f in files:
+            period = self._period(f)
+            if period is None or (period[0] <= last and period[1] >= first):
+                selected.append(f)
+        return selected
+
     def request_statements_for_time_range(self, iban: str, start: datetime, end: datetime) -> Iterable[BankTransaction]:
         account = self.accounts.get(iban)
         if not account:
             raise UnknownIban(self.conf.type, iban)
         rglob = list((Path(self.conf.token) / account.iban).rglob(self.engine.glob_pattern))
+        self._forget_missing(Path(self.conf.token) / account.iban, rglob)
+        rglob = self._select_documents(rglob, start, end)
         if len(rglob) == 0:
             return []
-        df = pd.concat(self.engine.parse_document(f) for f in rglob)
+        df = pd.concat(self._parse_documents(rglob))
         df = self.engine.post_process(df)
         df.drop_duplicates(inplace=True, keep='last')
-        def parse_row(r: pd.Series) -> BankTransaction:
-            # TODO: improve interface of parse_row: control Transaction fields
-            fields = self.engine.parse_row(r)
-            # TODO: determine the real timezone
-            return BankTransaction(**(fields | { 'account': account, 'time': fields['time'].astimezone(start.tzinfo) }))
-        df = df.apply(parse_row, axis=1, result_type='reduce')
-        return filter(lambda t: start <= t.time <= end, df)
+        cols = self.engine.to_columns(df)
+        # TODO: determine the real timezone
+        # Document times are naive local times: filter them against local bounds
+        local_start, local_end = (t.astimezone().replace(tzinfo=None) for t in (start, end))
+        cols = cols[(cols.time >= local_start) & (cols.time <= local_end)]
+        return [BankTransaction(
+            account=account,
+            time=r.time.to_pydatetime().astimezone(start.tzinfo),
+            amount=int(r.amount),
+            description=getattr(r, 'description', ''),
+            comment=getattr(r, 'comment', None),
+            mcc=getattr(r, 'mcc', None),
+        ) for r in cols.itertuples(index=False)]
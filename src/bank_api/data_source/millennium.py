@@ -1,9 +1,10 @@
 from .fs import FilesystemBankApiEngine
+from . import pdf
 from utils.exchange_rates import init_rates_cache, Currency
-import tabula
 import pandas as pd
 import re
 from pathlib import Path
+from datetime import date
 
 
 class Engine(FilesystemBankApiEngine):
@@ -12,14 +13,22 @@ class Engine(FilesystemBankApiEngine):
     """
 
     EXTRATO_COMBINADO='EXTRATO COMBINADO'
+    time_column = 'data_lanc'
 
     @property
     def glob_pattern(self) -> str:
         return f'{Engine.EXTRATO_COMBINADO} 20*.pdf'
 
+    def document_period(self, f: Path) -> tuple[date, date] | None:
+        # The year of all operations is deduced from the file name, see parse_document
+        if m := re.match(Engine.EXTRATO_COMBINADO + r' (\d{4})\d{3}\.pdf', f.name):
+            year = int(m.group(1))
+            return date(year, 1, 1), date(year, 12, 31)
+        return None
+
     def parse_document(self, f: Path) -> pd.DataFrame:
         # Columns are located at 1.1, 1.51, 4.7, 5.77, 6.95 inches from the left side.
-        df = tabula.read_pdf(f, pages='all', lattice=False, multiple_tables=False,
+        df = pdf.read_pdf(f, pages='all', lattice=False, multiple_tables=False,
                              columns=[13.3, 18.3, 57.1, 70.1, 84.4], relative_columns=True,
                              stream=True, guess=False)[0]
         df.columns=['data_lanc', 'data_valor', 'descritivo', 'debito', 'credito', 'saldo']
@@ -58,11 +67,13 @@ class Engine(FilesystemBankApiEngine):
         df[['debito', 'credito']] = converted_values.multiply(rates, axis=0)
         return df
 
-    def parse_row(self, row: pd.Series) -> dict:
-        return {
-            'time': row.data_lanc.to_pydatetime(),
-            'amount':  int((row.credito or -row.debito) * 100),
-            'description': row.descritivo,
+    def to_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        amount = df.credito.where(df.credito != 0, -df.debito)
+        amount_orig = df.credito_orig.where(df.credito_orig != 0, df.debito_orig)
+        return pd.DataFrame({
+            'time': df.data_lanc,
+            'amount': (amount * 100).astype(int),
+            'description': df.descritivo,
             # FIXME: Remove this memo once budget migration to EUR is done.
-            'comment': f'€{row.credito_orig or row.debito_orig:,.2f}'
-        }
+            'comment': amount_orig.map('€{:,.2f}'.format),
+        })
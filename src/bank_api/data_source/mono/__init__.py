@@ -1,17 +1,38 @@
 from .cancel_filter import CancelFilter
+from .store import StatementStore
+from .scheduler import StatementScheduler
 from .. import BankApi, BankTransaction, UnknownIban, MissingAccountConfiguration
 from model.configuration import BankApiConfiguration
-from monobank import MonobankApi, ApiClient
 from datetime import datetime, timedelta
+from pathlib import Path
 from collections.abc import Iterable
+from concurrent.futures import Future
+import threading
+from utils import profiling
 
 class Api(BankApi):
     def __init__(self, conf: BankApiConfiguration):
         self.conf = conf
-        self.mono_api = MonobankApi(ApiClient(conf.token, conf.n_retries))
+        self.mono_api = self._create_client(conf)
         self.accounts = { a.iban: a for a in conf.accounts if a.iban }
-        self.__account_id_by_iban = { a['iban']: a['id']
-            for a in self.mono_api.request_client_info()['accounts'] }
+        # Without cache_dir statements are still shared by pipelines of this process
+        self.store = StatementStore(
+            str(Path(conf.cache_dir) / 'monobank.sqlite') if conf.cache_dir else ':memory:',
+            settled_seconds=conf.settled_days * 24 * 3600,
+            reuse_seconds=conf.reuse_seconds)
+        self.scheduler = StatementScheduler.for_token(conf.token, conf.request_interval)
+        # account_id -> [(start, end, done)] of gaps being fetched, shared by concurrent requests
+        self.__in_flight: dict[str, list[tuple[int, int, Future]]] = {}
+        self.__in_flight_lock = threading.RLock()
+        with profiling.timed('http', 'monobank'):
+            client_info = self.mono_api.request_client_info()
+        self.__account_id_by_iban = { a['iban']: a['id'] for a in client_info['accounts'] }
+
+    @staticmethod
+    def _create_client(conf: BankApiConfiguration):
+        # Imported here so that the store and scheduler work without the client
+        from monobank import MonobankApi, ApiClient
+        return MonobankApi(ApiClient(conf.token, conf.n_retries))
 
     def request_statements_for_time_range(self, iban: str, start: datetime, end: datetime) -> Iterable[BankTransaction]:
         account_id = self.__account_id_by_iban.get(iban)
@@ -21,19 +42,15 @@ class Api(BankApi):
         if not account:
             raise MissingAccountConfiguration(self.conf.type, iban)
         
-        raw_statements = []
-        part = start
-        # Request by chunks if period is longer than allowed by Monobank API.
-        while part < end:
-            step = min(end - part, self.mono_api.MAX_PERIOD)
-            next_part = part + step
-            print(f'Fetching {account.source_name}.{account.name} from {part} to {next_part}')
-            raw_statements.extend(
-                self.mono_api.request_statements_for_time_range(account_id, part, next_part))
-            part = next_part
-            
+        start_ts, end_ts = int(start.timestamp()), int(end.timestamp())
+        submitted_at = int(datetime.now().timestamp())
+        with self.__in_flight_lock:
+            parts = [part for gap_start, gap_end in self.store.gaps(account_id, start_ts, end_ts, submitted_at)
+                     for part in self.__plan_gap(account, account_id, gap_start, gap_end, start.tzinfo, submitted_at)]
+        raw_statements = self.__collect_stored(account_id, start_ts, end_ts, parts)
+
         if self.conf.remove_cancelled_statements:
-            raw_statements = filter(CancelFilter(raw_statements), raw_statements)
+            raw_statements = self.__remove_cancelled(raw_statements)
         return map(lambda s: BankTransaction(
             account=self.accounts[iban],
             id=s['id'],
@@ -43,3 +60,89 @@ class Api(BankApi):
             comment=s.get('comment'),
             description=s['description']
         ), raw_statements)
+
+    @staticmethod
+    def __remove_cancelled(raw_statements: Iterable[dict]) -> Iterable[dict]:
+        # Cancellations are matched across the whole period, so wait for all chunks.
+        # This only happens on iteration: requests of other accounts are queued meanwhile.
+        raw_statements = list(raw_statements)
+        yield from filter(CancelFilter(raw_statements), raw_statements)
+
+    def __plan_gap(self, account, account_id: str, gap_start: int, gap_end: int, tz, submitted_at: int) -> list:
+        """Split a gap into parts fetched by a concurrent request, which are waited for,
+        and parts to fetch. Returns [(start, end, chunk futures or None, done)]."""
+        parts = []
+        for f_start, f_end, done in sorted(self.__in_flight.get(account_id, []), key=lambda f: f[0]):
+            if f_end < gap_start or f_start > gap_end:
+                continue
+            if f_start > gap_start:
+                parts.append(self.__fetch_gap(account, account_id, gap_start, f_start - 1, tz, submitted_at))
+            parts.append((max(gap_start, f_start), min(gap_end, f_end), None, done))
+            gap_start = f_end + 1
+        if gap_start < gap_end:
+            parts.append(self.__fetch_gap(account, account_id, gap_start, gap_end, tz, submitted_at))
+        return parts
+
+    def __fetch_gap(self, account, account_id: str, start: int, end: int, tz, submitted_at: int):
+        """Queue requests of a gap. Once all chunks arrive they are stored, and `done` completes."""
+        chunks = self.__submit(account, account_id, datetime.fromtimestamp(start, tz), datetime.fromtimestamp(end, tz))
+        done = Future()
+        entry = (start, end, done)
+        remaining = len(chunks)
+        remaining_lock = threading.Lock()
+
+        def on_chunk(_):
+            nonlocal remaining
+            with remaining_lock:
+                remaining -= 1
+                if remaining:
+                    return
+            try:
+                statements = [s for chunk in chunks for s in chunk.result()]
+                self.store.add(account_id, start, end, statements, submitted_at)
+                done.set_result(None)
+            except BaseException as e:
+                done.set_exception(e)
+            finally:
+                with self.__in_flight_lock:
+                    self.__in_flight[account_id].remove(entry)
+
+        self.__in_flight.setdefault(account_id, []).append(entry)
+        for chunk in chunks:
+            chunk.add_done_callback(on_chunk)
+        return start, end, chunks, done
+
+    def __submit(self, account, account_id: str, start: datetime, end: datetime) -> list[Future]:
+        """Queue requests for [start, end] in the token's scheduler.
+        Results arrive in the returned futures, one per chunk."""
+        futures = []
+        part = start
+        # Request by chunks if period is longer than allowed by Monobank API.
+        while part < end:
+            step = min(end - part, self.mono_api.MAX_PERIOD)
+            next_part = part + step
+            futures.append(self.scheduler.submit(
+                account_id, self.__fetch_chunk, account, account_id, part, next_part))
+            part = next_part
+        return futures
+
+    def __fetch_chunk(self, account, account_id: str, start: datetime, end: datetime) -> list[dict]:
+        print(f'Fetching {account.source_name}.{account.name} from {start} to {end}')
+        with profiling.timed('http', 'monobank'):
+            return self.mono_api.request_statements_for_time_range(account_id, start, end)
+
+    def __collect_stored(self, account_id: str, start: int, end: int, parts) -> Iterable[dict]:
+        """Yield statements of [start, end] in time order: stored ones from the store,
+        fetched ones chunk by chunk as soon as each chunk arrives, and ones fetched
+        by a concurrent request from the store once that request has stored them."""
+        for part_start, part_end, chunks, done in parts:
+            yield from self.store.statements(account_id, start, part_start - 1)
+            if chunks is None:
+                done.result()
+                yield from self.store.statements(account_id, part_start, part_end)
+            else:
+                for f in chunks:
+                    yield from sorted(f.result(), key=lambda s: int(s['time']))
+                done.result()
+            start = part_end + 1
+        yield from self.store.statements(account_id, start, end)
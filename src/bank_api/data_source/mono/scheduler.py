@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+
+class StatementScheduler:
+    """Dispatches statement requests of a single Monobank token at the allowed rate.
+
+    Requests are queued per account and served round-robin, so that accounts
+    of a token progress together. Each token has its own scheduler with its
+    own worker thread, so waits of different tokens overlap.
+    """
+
+    __instances: dict[str, 'StatementScheduler'] = {}
+    __instances_lock = threading.Lock()
+
+    @classmethod
+    def for_token(cls, token: str, interval: float) -> 'StatementScheduler':
+        with cls.__instances_lock:
+            if token not in cls.__instances:
+                cls.__instances[token] = cls(interval)
+            scheduler = cls.__instances[token]
+            # The configured interval may have changed since, e.g. on a config reload
+            scheduler.interval = interval
+            return scheduler
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.__queues: dict[str, deque] = {}
+        self.__round_robin: deque[str] = deque()
+        self.__cond = threading.Condition()
+        self.__next_slot = 0.0
+        threading.Thread(target=self.__run, daemon=True).start()
+
+    def submit(self, key: str, fn: Callable, *args) -> Future:
+        """Queue a request under `key` (e.g. account id). Returns a Future of its result."""
+        future = Future()
+        with self.__cond:
+            if key not in self.__queues:
+                self.__queues[key] = deque()
+                self.__round_robin.append(key)
+            self.__queues[key].append((future, fn, args))
+            self.__cond.notify()
+        return future
+
+    def __take(self):
+        with self.__cond:
+            while not self.__round_robin:
+                self.__cond.wait()
+            key = self.__round_robin.popleft()
+            queue = self.__queues[key]
+            item = queue.popleft()
+            if queue:
+                self.__round_robin.append(key)
+            else:
+                del self.__queues[key]
+            return item
+
+    def __run(self):
+        while True:
+            future, fn, args = self.__take()
+            if not future.set_running_or_notify_cancel():
+                continue
+            time.sleep(max(0.0, self.__next_slot - time.monotonic()))
+            self.__next_slot = time.monotonic() + self.interval
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
@@ -0,0 +1,97 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+
+class StatementStore:
+    """SQLite store of raw Monobank statements.
+
+    Besides the statements it remembers the time intervals (unix timestamps)
+    that were fetched completely, so only the gaps need to be requested again.
+    Only settled history is recorded as covered: statements newer than
+    `settled_seconds` at fetch time are refetched on every run. Within a process,
+    an interval fetched less than `reuse_seconds` ago is reused as is, and when it
+    reached the time of fetching it also covers the following `reuse_seconds`,
+    so pipelines running one after another share a fetch.
+
+    With `path` ':memory:' the store lives only as long as the process.
+    """
+
+    def __init__(self, path: str, settled_seconds: int, reuse_seconds: int = 0):
+        self.settled_seconds = settled_seconds
+        self.reuse_seconds = reuse_seconds
+        self.__lock = threading.Lock()
+        # account_id -> [(start, end, fetched_at)] of recent fetches
+        self.__recent: dict[str, list[tuple[int, int, int]]] = {}
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__db:
+            self.__db.execute('''CREATE TABLE IF NOT EXISTS statements (
+                account_id TEXT, id TEXT, time INTEGER, data TEXT,
+                PRIMARY KEY (account_id, id))''')
+            self.__db.execute('''CREATE TABLE IF NOT EXISTS coverage (
+                account_id TEXT, start INTEGER, end INTEGER)''')
+
+    def __coverage(self, account_id: str) -> list[tuple[int, int]]:
+        return self.__db.execute(
+            'SELECT start, end FROM coverage WHERE account_id = ? ORDER BY start',
+            (account_id,)).fetchall()
+
+    def __reusable(self, account_id: str, now: int) -> list[tuple[int, int]]:
+        recent = [r for r in self.__recent.get(account_id, []) if now - r[2] <= self.reuse_seconds]
+        self.__recent[account_id] = recent
+        return [(start, end + self.reuse_seconds if end >= fetched_at - self.reuse_seconds else end)
+                for start, end, fetched_at in recent]
+
+    def gaps(self, account_id: str, start: int, end: int, now: int) -> list[tuple[int, int]]:
+        """Sub-intervals of [start, end] that are not covered yet."""
+        with self.__lock:
+            coverage = sorted(self.__coverage(account_id) + self.__reusable(account_id, now))
+        gaps = []
+        for c_start, c_end in coverage:
+            if c_end < start:
+                continue
+            if c_start > end:
+                break
+            if c_start > start:
+                gaps.append((start, c_start))
+            start = max(start, c_end)
+        if start < end:
+            gaps.append((start, end))
+        return gaps
+
+    def add(self, account_id: str, start: int, end: int, statements: list[dict], fetched_at: int):
+        """Replace statements of [start, end] with freshly fetched ones
+        and mark the settled part of the interval as covered."""
+        with self.__lock, self.__db:
+            self.__db.execute(
+                'DELETE FROM statements WHERE account_id = ? AND time BETWEEN ? AND ?',
+                (account_id, start, end))
+            self.__db.executemany(
+                'INSERT OR REPLACE INTO statements VALUES (?, ?, ?, ?)',
+                ((account_id, s['id'], int(s['time']), json.dumps(s)) for s in statements))
+            if self.reuse_seconds:
+                self.__recent.setdefault(account_id, []).append((start, end, fetched_at))
+            end = min(end, fetched_at - self.settled_seconds)
+            if start < end:
+                self.__add_coverage(account_id, start, end)
+
+    def __add_coverage(self, account_id: str, start: int, end: int):
+        # Merge with all overlapping or adjacent intervals to keep the table compact
+        overlapping = self.__db.execute(
+            'SELECT start, end FROM coverage WHERE account_id = ? AND start <= ? AND end >= ?',
+            (account_id, end, start)).fetchall()
+        for c_start, c_end in overlapping:
+            start, end = min(start, c_start), max(end, c_end)
+        self.__db.execute(
+            'DELETE FROM coverage WHERE account_id = ? AND start >= ? AND end <= ?',
+            (account_id, start, end))
+        self.__db.execute('INSERT INTO coverage VALUES (?, ?, ?)', (account_id, start, end))
+
+    def statements(self, account_id: str, start: int, end: int) -> list[dict]:
+        with self.__lock:
+            rows = self.__db.execute(
+                'SELECT data FROM statements WHERE account_id = ? AND time BETWEEN ? AND ? ORDER BY time',
+                (account_id, start, end)).fetchall()
+        return [json.loads(data) for data, in rows]
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import pickle
+import tempfile
+import threading
+from datetime import date
+from pathlib import Path
+import pandas as pd
+
+class ParsedDocumentCache:
+    """Parsed statement documents stored as pickled DataFrames.
+
+    Entries are keyed by file path, size, modification time and engine version,
+    so only new or changed documents need to be parsed again.
+    Also keeps an index of the dates each document covers (`periods.json`),
+    which allows skipping documents outside of a requested time range.
+    Pickle is used instead of Parquet/Feather: tables extracted by tabula have
+    mixed-type object columns, and it needs no extra dependency.
+    """
+
+    def __init__(self, cache_dir: str, engine):
+        self.path = Path(cache_dir) / 'parsed' / type(engine).__module__.rsplit('.', 1)[-1]
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.engine_id = f'{type(engine).__module__}.{type(engine).__qualname__}:{engine.version}'
+        self.__periods_lock = threading.Lock()
+        try:
+            with open(self.path / 'periods.json') as f:
+                self.__periods = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.__periods = {}
+
+    def __entry(self, f: Path) -> Path:
+        st = f.stat()
+        key = f'{f.resolve()}:{st.st_size}:{st.st_mtime_ns}:{self.engine_id}'
+        return self.path / f'{hashlib.sha1(key.encode()).hexdigest()}.pkl'
+
+    def get(self, f: Path) -> pd.DataFrame | None:
+        try:
+            with open(self.__entry(f), 'rb') as cached:
+                return pickle.load(cached)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # E.g. written by an incompatible pandas version; parse again
+            return None
+
+    def put(self, f: Path, df: pd.DataFrame):
+        entry = self.__entry(f)
+        # A temporary file per writer: concurrent runs may store the same document
+        with tempfile.NamedTemporaryFile(dir=self.path, suffix='.tmp', delete=False) as out:
+            tmp = Path(out.name)
+            try:
+                pickle.dump(df, out)
+            except BaseException:
+                out.close()
+                tmp.unlink()
+                raise
+        tmp.replace(entry)
+
+    def get_period(self, f: Path) -> tuple[date, date] | None:
+        """First and last date of operations in a document, if it was parsed before."""
+        period = self.__periods.get(self.__entry(f).stem)
+        return (date.fromisoformat(period[0]), date.fromisoformat(period[1])) if period else None
+
+    def put_period(self, f: Path, first: date, last: date):
+        with self.__periods_lock:
+            self.__periods[self.__entry(f).stem] = [first.isoformat(), last.isoformat()]
+            tmp = self.path / 'periods.json.tmp'
+            with open(tmp, 'w') as out:
+                json.dump(self.__periods, out)
+            tmp.replace(self.path / 'periods.json')
@@ -0,0 +1,37 @@
+"""Single entry point for extracting tables from PDF statements.
+
+All PDF engines call `read_pdf`, so extraction is timed in one place.
+tabula-py runs Java in-process through jpype when it is installed (its
+default); without jpype every call starts a new JVM, which costs seconds
+per document.
+"""
+
+import importlib.util
+import threading
+from pathlib import Path
+
+import pandas as pd
+import tabula
+
+from utils import profiling
+
+HAS_JPYPE = importlib.util.find_spec('jpype') is not None
+
+_warned = False
+_warn_lock = threading.Lock()
+
+
+def _warn_without_jpype():
+    global _warned
+    with _warn_lock:
+        if not _warned:
+            _warned = True
+            print('PDF extraction: jpype is not installed, tabula will start a JVM per document')
+
+
+def read_pdf(f: Path, **options) -> list[pd.DataFrame]:
+    """tabula.read_pdf() with timing."""
+    if not HAS_JPYPE:
+        _warn_without_jpype()
+    with profiling.timed('pdf', 'tabula'):
+        return tabula.read_pdf(f, **options)
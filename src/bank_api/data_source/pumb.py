@@ -1,17 +1,18 @@
 from .fs import FilesystemBankApiEngine
-import tabula
+from . import pdf
 import pandas as pd
-import re
 from pathlib import Path
-from datetime import datetime
 
 class Engine(FilesystemBankApiEngine):
+    time_column = 'date'
+    time_format = '%Y-%m-%d\r%H:%M:%S'
+
     @property
     def glob_pattern(self) -> str:
         return '*.pdf'
 
     def parse_document(self, f: Path) -> pd.DataFrame:
-        df = tabula.read_pdf(f, pages='all', lattice=True, multiple_tables=False)[0]
+        df = pdf.read_pdf(f, pages='all', lattice=True, multiple_tables=False)[0]
         # todo: map from the original column names instead of forcing
         df.columns = ['date', 'amount_orig', 'date_posted', 'amount_uah', 'commission', 'card_num', 'description', 'type']
         df.drop(df.tail(4).index, inplace=True) # Drop summary
@@ -22,10 +23,13 @@ class Engine(FilesystemBankApiEngine):
     def post_process(self, df: pd.DataFrame) -> pd.DataFrame:
         return df.drop_duplicates(['date', 'amount_uah'], keep='last')
 
-    def parse_row(self, row: pd.Series) -> dict:
-        amount = float(re.match(r'(-?\d+\.\d{2})(?:UAH)?', row.amount_uah.replace(' ', '')).group(1))
-        return {
-            'time': datetime.strptime(row.date, '%Y-%m-%d\r%H:%M:%S'),
-            'amount':  int(amount * (100 if row.type == 'Надходження' else -100)),
-            'description': ' '.join(re.split(r'\s+', row.description))
-        }
+    def to_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        amount = (df.amount_uah.str.replace(' ', '', regex=False)
+            .str.extract(r'^(-?\d+\.\d{2})(?:UAH)?', expand=False)
+            .astype(float))
+        sign = df.type.eq('Надходження').map({True: 100, False: -100})
+        return pd.DataFrame({
+            'time': pd.to_datetime(df.date, format=self.time_format),
+            'amount': (amount * sign).astype(int),
+            'description': df.description.str.split(r'\s+', regex=True).str.join(' '),
+        })
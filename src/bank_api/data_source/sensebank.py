@@ -1,9 +1,11 @@
 from .fs import FilesystemBankApiEngine
 import pandas as pd
 from pathlib import Path
-from datetime import datetime
 
 class Engine(FilesystemBankApiEngine):
+    time_column = 'date'
+    time_format = '%d.%m.%y %H:%M'
+
     @property
     def glob_pattern(self) -> str:
         return '*.csv'
@@ -15,10 +17,11 @@ class Engine(FilesystemBankApiEngine):
         df.rename(inplace=True, columns={'Дата і час': 'date', 'Деталі': 'description', 'MCC': "mcc", 'Cума списання': 'credit', 'Cума зарахування': 'debit'})
         return df
     
-    def parse_row(self, row: pd.Series) -> dict:
-        return {
-            'time': datetime.strptime(row.date, '%d.%m.%y %H:%M'),
-            'amount': int(float(row.credit if pd.isna(row.debit) else row.debit) * 100),
-            'description': row.description,
-            'mcc': row.mcc
-        }
+    def to_columns(self, df: pd.DataFrame) -> pd.DataFrame:
+        amount = df.credit.where(df.debit.isna(), df.debit).astype(float)
+        return pd.DataFrame({
+            'time': pd.to_datetime(df.date, format=self.time_format),
+            'amount': (amount * 100).astype(int),
+            'description': df.description,
+            'mcc': df.mcc,
+        })
@@ -10,9 +10,12 @@ from dotenv import load_dotenv
 load_dotenv()
 
 from .schema import (
-    RootConfig, BudgetConfig, SourceConfig,
+    RootConfig, BudgetConfig, SourceConfig, PipelineConfig,
     MonobankSourceConfig, TrackingSourceConfig,
 )
+from ynab_api import YnabApiPool
+from bank_api import BankApiPool
+from utils.exchange_rates import RateStore
 from model.configuration import (
     BankAccountConfiguration, BankApiConfiguration, BankApiName,
     PipelineContext, ResolvedBudget, TimeRange,
@@ -25,6 +28,7 @@ def load(config_path: str = 'config/config.yaml') -> PipelineContext:
         raw = _resolve_env_vars(yaml.safe_load(f))
 
     schema = RootConfig.model_validate(raw)
+    RateStore.configure(schema.cache_dir)
     sources_data = _load_yaml(schema.sources) if isinstance(schema.sources, str) else schema.sources
     budgets_data = _load_yaml(schema.budgets) if isinstance(schema.budgets, str) else schema.budgets
 
@@ -60,6 +64,10 @@ def load(config_path: str = 'config/config.yaml') -> PipelineContext:
                 n_retries=src_cfg.retries,
                 remove_cancelled_statements=src_cfg.remove_cancelled,
                 accounts=source_accounts,
+                cache_dir=schema.cache_dir,
+                settled_days=src_cfg.settled_days,
+                request_interval=src_cfg.request_interval,
+                reuse_seconds=src_cfg.reuse_seconds,
             )
         else:
             source_configs[source_id] = BankApiConfiguration(
@@ -69,6 +77,8 @@ def load(config_path: str = 'config/config.yaml') -> PipelineContext:
                 n_retries=0,
                 remove_cancelled_statements=False,
                 accounts=source_accounts,
+                cache_dir=schema.cache_dir,
+                parse_workers=src_cfg.parse_workers,
             )
 
     # Build resolved budgets
@@ -85,14 +95,18 @@ def load(config_path: str = 'config/config.yaml') -> PipelineContext:
         source_configs=source_configs,
         budgets=budgets,
         pipeline_paths=dict(schema.pipelines),
+        cache_dir=schema.cache_dir,
+        ynab=YnabApiPool(schema.cache_dir),
+        bank_apis=BankApiPool(),
+        config_files=[config_path] + [p for p in (schema.sources, schema.budgets) if isinstance(p, str)],
     )
 
 
-def load_pipeline(pipeline_path: str) -> list[dict]:
-    """Load pipeline step definitions from YAML."""
+def load_pipeline(pipeline_path: str) -> PipelineConfig:
+    """Load and validate a pipeline definition from YAML."""
     with open(pipeline_path) as f:
         raw = yaml.safe_load(f)
-    return raw['steps']
+    return PipelineConfig.model_validate(raw)
 
 
 def resolve_time_range(time_range_config: dict) -> TimeRange:
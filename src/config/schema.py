@@ -14,12 +14,16 @@ class MonobankSourceConfig(BaseModel):
     token: str
     retries: int = 5
     remove_cancelled: bool = True
+    settled_days: int = 7               # cached statements older than this are not refetched
+    request_interval: float = 60        # min seconds between statement requests of this token
+    reuse_seconds: int = 300            # statements fetched this recently are not refetched by other pipelines
     accounts: dict[str, AccountConfig]
 
 
 class FilesystemSourceConfig(BaseModel):
     type: Literal['pumb', 'pumb_credit', 'sensebank', 'abank', 'privatbank', 'ukrsibbank', 'millennium']
     path: str
+    parse_workers: int = 1              # parse documents in a pool of this many processes
     accounts: dict[str, AccountConfig]
 
 
@@ -39,7 +43,20 @@ class BudgetConfig(BaseModel):
     budget: str
 
 
+class ScheduleConfig(BaseModel):
+    every: str | float | None = None      # interval: seconds or a duration like '15m', '1h'
+    cron: str | None = None               # or a 5-field cron expression in local time
+
+
+class PipelineConfig(BaseModel):
+    steps: list[dict]
+    execution: Literal['serial', 'threaded', 'async'] = 'serial'  # see pipeline.Pipeline.from_config
+    queue_size: int = 64                  # max transactions buffered between threaded steps
+    schedule: ScheduleConfig | None = None  # when to run in --serve mode
+
+
 class RootConfig(BaseModel):
     sources: str | dict                   # path to YAML or inline dict
     budgets: str | dict[str, BudgetConfig]  # path to YAML or inline dict
     pipelines: dict[str, str]             # name -> path to pipeline YAML
+    cache_dir: str | None = None          # directory for persistent caches; disabled if not set
@@ -0,0 +1,161 @@
+"""Long-running mode: run pipelines on their schedules with warm caches.
+
+The context is loaded once and reused by all runs, so YNAB metadata, bank
+clients, fetched statements, parsed documents, exchange rates and mapping
+tables stay warm and a run only fetches and uploads what changed. YNAB
+accounts and categories are synced by delta at the start of each run, so
+changes made in YNAB meanwhile are picked up. Steps are still built anew for
+every run, so stateful filters start clean.
+"""
+
+import dataclasses
+import os
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime
+
+import config
+from config.schema import PipelineConfig
+from model.configuration import PipelineContext
+from pipeline import Pipeline
+from utils import schedule
+
+
+@dataclass
+class ScheduledPipeline:
+    name: str
+    cfg: PipelineConfig
+    schedule: schedule.Interval | schedule.CronExpression
+    next_run: datetime
+
+
+class Daemon:
+    """Runs pipelines when they are due and reloads the config when its files change.
+
+    A pipeline that is still running when it is due again is skipped until its
+    next scheduled time. Runs of different pipelines may overlap, up to `jobs`.
+    """
+
+    # How often to check for due pipelines and changed config files, seconds
+    POLL_INTERVAL = 1.0
+
+    def __init__(self, config_path: str = 'config/config.yaml',
+                 pipeline_names: list[str] | None = None, jobs: int = 1):
+        self.config_path = config_path
+        self.pipeline_names = pipeline_names    # None: all pipelines with a schedule
+        self.executor = ThreadPoolExecutor(max_workers=max(1, jobs))
+        self.ctx: PipelineContext | None = None
+        self.config_mtimes: dict[str, float] = {}
+        self.pipelines: dict[str, ScheduledPipeline] = {}
+        # name -> (path, mtime) of the last loaded or rejected pipeline file
+        self.pipeline_versions: dict[str, tuple[str, float]] = {}
+        self.running: dict[str, Future] = {}
+
+    def serve(self):
+        print(f'Serving pipelines (config: {self.config_path})')
+        self.reload()
+        unknown = [n for n in self.pipeline_names or [] if n not in self.ctx.pipeline_paths]
+        if unknown:
+            raise ValueError(f'Unknown pipelines: {", ".join(unknown)}')
+        try:
+            while True:
+                self.reload()
+                self.run_due(datetime.now())
+                time.sleep(self.POLL_INTERVAL)
+        finally:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def reload(self):
+        """Reload the context and pipeline definitions whose files changed.
+        API pools of the previous context are kept: bank APIs are recreated by
+        the pool when their source configuration changes, and YNAB wrappers are
+        per token, so only a changed `cache_dir` needs a new YNAB pool.
+        Invalid files are reported and the previous version stays in use."""
+        if self.ctx is None or self.__changed(self.config_mtimes):
+            try:
+                ctx = config.load(self.config_path)
+            except Exception:
+                print('Failed to load config:')
+                traceback.print_exc()
+                if self.ctx is None:
+                    raise
+                # Do not retry until the files change again
+                self.config_mtimes = self.__mtimes(list(self.config_mtimes))
+                return
+            if self.ctx is not None:
+                print('Config changed, reloaded')
+                ynab = self.ctx.ynab if ctx.cache_dir == self.ctx.cache_dir else ctx.ynab
+                ctx = dataclasses.replace(ctx, ynab=ynab, bank_apis=self.ctx.bank_apis)
+            self.ctx = ctx
+            self.config_mtimes = self.__mtimes(ctx.config_files)
+
+        names = self.pipeline_names or list(self.ctx.pipeline_paths)
+        for name in list(self.pipeline_versions):
+            if name not in names or name not in self.ctx.pipeline_paths:
+                if self.pipelines.pop(name, None):
+                    print(f'Pipeline {name} removed from schedule')
+                del self.pipeline_versions[name]
+        for name in names:
+            if name in self.ctx.pipeline_paths:
+                self.__reload_pipeline(name, self.ctx.pipeline_paths[name])
+
+    def __reload_pipeline(self, name: str, path: str):
+        version = (path, self.__mtimes([path])[path])
+        if self.pipeline_versions.get(name) == version:
+            return
+        self.pipeline_versions[name] = version
+        try:
+            cfg = config.load_pipeline(path)
+            if cfg.schedule is None:
+                print(f'Pipeline {name} has no schedule, skipped')
+                self.pipelines.pop(name, None)
+                return
+            sched = schedule.create(cfg.schedule.every, cfg.schedule.cron)
+        except Exception as e:
+            print(f'Failed to load pipeline {name}: {e}')
+            return
+        # Keep the planned run if the schedule did not change. A newly scheduled
+        # interval pipeline runs right away rather than an interval later.
+        current = self.pipelines.get(name)
+        now = datetime.now()
+        if current and current.schedule == sched:
+            next_run = current.next_run
+        elif current is None and isinstance(sched, schedule.Interval):
+            next_run = now
+        else:
+            next_run = sched.next_after(now)
+        self.pipelines[name] = ScheduledPipeline(name, cfg, sched, next_run)
+        print(f'Scheduled pipeline {name}: {sched!r}, next run at {next_run:%Y-%m-%d %H:%M:%S}')
+
+    def run_due(self, now: datetime):
+        for p in self.pipelines.values():
+            if p.next_run > now:
+                continue
+            running = self.running.get(p.name)
+            if running and not running.done():
+                print(f'Pipeline {p.name} is still running, skipping the run due at {p.next_run:%H:%M:%S}')
+            else:
+                self.running[p.name] = self.executor.submit(self.run_pipeline, p.name, p.cfg, self.ctx)
+            p.next_run = p.schedule.next_after(now)
+
+    @staticmethod
+    def run_pipeline(name: str, pipeline_cfg: PipelineConfig, ctx: PipelineContext) -> bool:
+        print(f'[{datetime.now():%Y-%m-%d %H:%M:%S}] Running pipeline: {name}')
+        try:
+            ctx.ynab.refresh()
+            Pipeline.from_config(pipeline_cfg, ctx).run(collect=False)
+            print(f'[{datetime.now():%Y-%m-%d %H:%M:%S}] Pipeline {name} done')
+            return True
+        except Exception:
+            print(f'Pipeline {name} failed:')
+            traceback.print_exc()
+            return False
+
+    @staticmethod
+    def __mtimes(paths: list[str]) -> dict[str, float]:
+        return {p: os.stat(p).st_mtime if os.path.exists(p) else 0 for p in paths}
+
+    def __changed(self, mtimes: dict[str, float]) -> bool:
+        return self.__mtimes(list(mtimes)) != mtimes
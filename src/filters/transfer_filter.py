@@ -1,26 +1,32 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
 from model.transaction import YnabTransaction
 
 class TransferFilter:
     """Filter object that prevents duplication of transfers between two YNAB accounts.
     If a pair of transactions that describe a single transfer appear in a single set,
     YNAB will register both of them independently. This filter object will remove one in each pair.
-    """
 
-    def __init__(self):
-        self.transfer_statements = []
+    Legs of a transfer may settle on different days: a leg pairs with the opposite
+    one dated up to `days` apart, closest date first.
+    """
 
-    def __make_transfer_id(t: YnabTransaction, forward: bool):
-        src = t.detail.account_id
-        dst = t.detail.transfer_account_id
-        amount = t.detail.amount
-        date = str(t.detail.var_date)
-        return f'{date}_{src}_{dst}_{amount}' if forward else f'{date}_{dst}_{src}_{-amount}'
+    def __init__(self, days: int = 0):
+        self.offsets = [timedelta(days=d) for d in sorted(range(-days, days + 1), key=abs)]
+        # (src, dst, amount) -> multiset of dates of unmatched transfers
+        self.transfer_statements: dict[tuple, Counter] = defaultdict(Counter)
 
     def __call__(self, t: YnabTransaction):
-        if t.detail.transfer_account_id:
-            try:
-                self.transfer_statements.remove(TransferFilter.__make_transfer_id(t, False))
-                return False
-            except ValueError:
-                self.transfer_statements.append(TransferFilter.__make_transfer_id(t, True))
+        d = t.detail
+        if d.transfer_account_id:
+            opposite = self.transfer_statements.get((d.transfer_account_id, d.account_id, -d.amount))
+            if opposite:
+                for offset in self.offsets:
+                    date = d.var_date + offset
+                    if opposite[date]:
+                        opposite[date] -= 1
+                        if not opposite[date]:
+                            del opposite[date]
+                        return False
+            self.transfer_statements[(d.account_id, d.transfer_account_id, d.amount)][d.var_date] += 1
         return True
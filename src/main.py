@@ -1,19 +1,78 @@
 #!/usr/bin/env python3
 
+import argparse
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
 import config
 from pipeline import Pipeline
+from utils import profiling
+
+parser = argparse.ArgumentParser(description='Import bank transactions into YNAB.')
+parser.add_argument('pipelines', nargs='*', metavar='PIPELINE',
+                    help='pipelines to run, in order (default: daily_import)')
+parser.add_argument('--all', action='store_true',
+                    help='run all pipelines listed in the config')
+parser.add_argument('--jobs', type=int, default=1, metavar='N',
+                    help='run up to N pipelines concurrently (default: %(default)s)')
+parser.add_argument('--serve', action='store_true',
+                    help='keep running and run pipelines on the schedules from their config '
+                         '(default: all pipelines with a schedule)')
+parser.add_argument('--profile', nargs='?', const='profile.json', metavar='REPORT',
+                    help='print per-step timings and write a JSON run report (default: %(const)s)')
+
+
+def main():
+    args = parser.parse_args()
+
+    if args.serve:
+        if args.profile:
+            parser.error('--profile is not supported with --serve')
+        from daemon import Daemon
+        Daemon(pipeline_names=args.pipelines or None, jobs=args.jobs).serve()
+
+    profiler = profiling.enable() if args.profile else None
+
+    print('Initialization')
+
+    # Pipelines of a run share the context, and with it the YNAB and bank API
+    # wrappers, fetched statements, parsed documents and exchange rates.
+    ctx = config.load()
+
+    pipeline_names = list(ctx.pipeline_paths) if args.all else args.pipelines or ['daily_import']
+    unknown = [name for name in pipeline_names if name not in ctx.pipeline_paths]
+    if unknown:
+        parser.error(f'unknown pipelines: {", ".join(unknown)} (configured: {", ".join(ctx.pipeline_paths)})')
+
+    def run_pipeline(name: str) -> bool:
+        print(f'Running pipeline: {name}')
+        try:
+            pipeline_cfg = config.load_pipeline(ctx.pipeline_paths[name])
+            name_prefix = f'{name}/' if len(pipeline_names) > 1 else ''
+            pipeline = Pipeline.from_config(pipeline_cfg, ctx, name_prefix)
+            pipeline.run(collect=False)
+            return True
+        except Exception:
+            print(f'Pipeline {name} failed:')
+            traceback.print_exc()
+            return False
 
-print('Initialization')
+    with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+        results = dict(zip(pipeline_names, executor.map(run_pipeline, pipeline_names)))
 
-ctx = config.load()
+    if profiler:
+        profiler.finish()
+        profiler.print_table()
+        profiler.write(args.profile)
+        print(f'Saved run report to {args.profile}')
 
-# TODO: CLI arg for pipeline selection
-pipeline_name = 'daily_import'
-steps_cfg = config.load_pipeline(ctx.pipeline_paths[pipeline_name])
+    failed = [name for name, ok in results.items() if not ok]
+    if failed:
+        raise SystemExit(f'Failed pipelines: {", ".join(failed)}')
 
-print(f'Running pipeline: {pipeline_name}')
+    print('Done')
 
-pipeline = Pipeline.from_config(steps_cfg, ctx)
-pipeline.run()
 
-print('Done')
+# Document parsing may spawn worker processes, which import this module again
+if __name__ == '__main__':
+    main()
@@ -4,6 +4,7 @@ from dataclasses import dataclass, field
 from enum import StrEnum
 from collections.abc import Iterable
 from typing import Any
+from functools import lru_cache
 import re
 
 
@@ -40,21 +41,62 @@ class BankApiConfiguration:
     n_retries: int
     remove_cancelled_statements: bool
     accounts: list[BankAccountConfiguration]
+    cache_dir: str | None = None    # persistent cache location, see PipelineContext.cache_dir
+    settled_days: int = 7           # statements older than this are considered immutable
+    request_interval: float = 60    # min seconds between statement requests per token
+    reuse_seconds: int = 300        # statements fetched this recently are reused within a process
+    parse_workers: int = 1          # processes for parsing statement documents
 
 
 class RegexDict:
-    """Dict-like collection whose keys are regular expressions."""
+    """Dict-like collection whose keys are regular expressions.
 
-    def __init__(self, iterable: Iterable[tuple[re.Pattern, Any]]):
+    Patterns are combined into a single alternation with a named group per
+    pattern, so the first matching pattern is found in one scan. Alternatives
+    are tried in order at the start of the key, which keeps first-match-wins
+    semantics of matching each pattern in turn. Patterns that cannot be combined
+    (different flags, backreferences) fall back to matching one by one.
+    Lookups are memoized by key, as the same payees repeat a lot.
+    """
+
+    def __init__(self, iterable: Iterable[tuple[re.Pattern, Any]], memo_size: int = 4096):
         self.__elements = list(iterable)
+        self.__combined = self.__combine([pattern for pattern, _ in self.__elements])
+        self.__first_match = lru_cache(maxsize=memo_size)(self.__find_first)
 
     def __repr__(self):
         return self.__elements.__repr__()
 
+    @staticmethod
+    def __combine(patterns: list[re.Pattern]) -> re.Pattern | None:
+        if not patterns or len({p.flags for p in patterns}) > 1:
+            return None
+        # Group numbers and names would shift in a combined pattern
+        if any(re.search(r'\\[1-9]|\(\?P=|\\g<', p.pattern) for p in patterns):
+            return None
+        try:
+            return re.compile(
+                '|'.join(f'(?P<_{i}>{p.pattern})' for i, p in enumerate(patterns)), patterns[0].flags)
+        except re.error:
+            return None
+
+    def __find_first(self, key, start: int = 0) -> int | None:
+        """Index of the first element at or after `start` whose pattern matches `key`."""
+        if start == 0 and self.__combined:
+            m = self.__combined.match(key)
+            return int(m.lastgroup[1:]) if m else None
+        return next((i for i in range(start, len(self.__elements))
+            if self.__elements[i][0].match(key)), None)
+
     def get(self, key, default=None, condition=lambda _: True):
         """Find an element whose regex pattern-key matches a given key."""
-        return next((value for pattern, value in self.__elements
-            if pattern.match(key) and condition(value)), default)
+        i = self.__first_match(key)
+        while i is not None:
+            value = self.__elements[i][1]
+            if condition(value):
+                return value
+            i = self.__find_first(key, i + 1)
+        return default
 
 
 @dataclass
@@ -78,3 +120,7 @@ class PipelineContext:
     source_configs: dict[str, BankApiConfiguration]
     budgets: dict[str, ResolvedBudget]
     pipeline_paths: dict[str, str] = field(default_factory=dict)
+    cache_dir: str | None = None
+    ynab: 'YnabApiPool' = None  # shared YNAB API wrappers, see ynab_api.YnabApiPool
+    bank_apis: 'BankApiPool' = None  # shared bank APIs, see bank_api.BankApiPool
+    config_files: list[str] = field(default_factory=list)  # files the context was loaded from
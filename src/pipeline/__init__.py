@@ -1,2 +1,2 @@
-from .pipeline import Pipeline
+from .pipeline import Pipeline, ThreadedPipeline, PipelineCancelled
 from .steps import build_steps
@@ -0,0 +1,108 @@
+"""Currency conversion methods, backed by NBU exchange rates."""
+
+import re
+
+import numpy as np
+
+from utils.exchange_rates import RateStore, Currency
+from model.transaction import YnabTransaction
+from .steps import register_method
+
+
+@register_method('convert_to_uah_by_memo')
+class ConvertToUahByMemo:
+    """Filters eligible transactions and converts EUR memo amounts to UAH.
+    Also re-formats memo to "<optional description> <euro sign><amount in {0:,.2f}>".
+    """
+
+    MEMO_RE = re.compile(
+        r'^\s*(?:(?P<text_before>[^\d$€()]+?)'                  # text_before
+        r'\s*[-( ]*\s*)?'                                       # delim and/or '('
+        r'(?P<currency>[€$])?'                                  # currency symbol
+        r'(?P<amount>[\d,]+(?:\.\d{1,2})?)'                     # amount
+        r'(?:\s*[-) ]\s*(?P<text_after>[^\d€()]+?)?)?\s*$')     # delim and/or ')' and text_after
+
+    def __init__(self, **kwargs):
+        self.rates = RateStore.default()
+
+    def _match(self, t: YnabTransaction) -> re.Match | None:
+        """Memo match of a transaction eligible for conversion, None otherwise."""
+        if t.detail.transfer_account_id:
+            return None
+        # Skip splits (for now)
+        if t.detail.subtransactions:
+            return None
+        # Skip transactions with any existing amount.
+        # Should be 0 to be eligible for conversion.
+        if t.detail.amount:
+            return None
+        # Match memo and skip different currency.
+        if m := self.MEMO_RE.match(t.detail.memo or ''):
+            return m if m.group('currency') in (None, '€') else None
+        return None
+
+    def filter(self, t: YnabTransaction) -> bool:
+        return self._match(t) is not None
+
+    def map(self, t: YnabTransaction) -> YnabTransaction:
+        return self.map_batch([t])[0]
+
+    def map_batch(self, batch: list[YnabTransaction]) -> list[YnabTransaction]:
+        eligible = [(t, m) for t in batch if (m := self._match(t))]
+        if not eligible:
+            return batch
+        rates = np.array(self.rates.rates_for(Currency.EUR, [t.detail.var_date for t, _ in eligible]))
+        memo_amounts = np.array([float(m.group('amount')) for _, m in eligible])
+        # Convert currency and present in milliunits format
+        amounts = -(memo_amounts * rates * 1000).astype(np.int64)
+        for (t, m), memo_amount, amount in zip(eligible, memo_amounts.tolist(), amounts.tolist()):
+            # Re-format memo
+            text_before = m.group('text_before') or m.group('text_after') or ''
+            if len(text_before) > 1:
+                text_before = text_before[0].capitalize() + text_before[1:]
+            t.detail.memo = f'{text_before} €{memo_amount:,.2f}'
+            t.detail.amount = amount
+        return batch
+
+
+@register_method('convert_to_eur')
+class ConvertToEur:
+    def __init__(self, **kwargs):
+        self.rates = RateStore.default()
+
+    def map(self, t: YnabTransaction) -> YnabTransaction:
+        return self.map_batch([t])[0]
+
+    def map_batch(self, batch: list[YnabTransaction]) -> list[YnabTransaction]:
+        by_memo, by_rate = [], []
+        for t in batch:
+            m = ConvertToUahByMemo.MEMO_RE.match(t.detail.memo or '')
+            if m and m.group('currency') in (None, '€') and not t.detail.subtransactions:
+                by_memo.append((t, m))
+            else:
+                by_rate.append(t)
+
+        # EUR amount is known from memo: take it, keeping the sign
+        if by_memo:
+            memo_amounts = np.array([float(m.group('amount')) for _, m in by_memo])
+            signs = np.array([1 if (t.detail.amount and t.detail.amount > 0) else -1 for t, _ in by_memo])
+            amounts = (memo_amounts * 1000).astype(np.int64) * signs
+            for (t, m), amount in zip(by_memo, amounts.tolist()):
+                t.detail.amount = amount
+                t.detail.memo = (f'{m.group("text_before") or ""} {m.group("text_after") or ""}').strip()
+
+        # Otherwise convert by the rate of the transaction date.
+        # Splits are converted per subtransaction and the total is their sum.
+        if by_rate:
+            rates = self.rates.rates_for(Currency.EUR, [t.detail.var_date for t in by_rate])
+            parts = [t.detail.subtransactions or [t.detail] for t in by_rate]
+            part_amounts = np.array([p.amount for ps in parts for p in ps], dtype=np.float64)
+            part_rates = np.repeat(rates, [len(ps) for ps in parts])
+            converted = iter((part_amounts / part_rates).astype(np.int64).tolist())
+            for t, ps in zip(by_rate, parts):
+                for p in ps:
+                    p.amount = next(converted)
+                if t.detail.subtransactions:
+                    t.detail.amount = sum(p.amount for p in ps)
+
+        return batch
@@ -1,9 +1,15 @@
 """Pipeline: composable transaction processing via chained steps."""
 
-from collections.abc import Callable, Iterable
+import asyncio
+import queue
+import threading
+from collections import deque
+from collections.abc import AsyncIterable, Callable, Iterable, Iterator
 
 from model.transaction import YnabTransaction
 from model.configuration import PipelineContext
+from config.schema import PipelineConfig
+from utils import aio
 
 # Each step is a callable: Iterable[YnabTransaction] -> Iterable[YnabTransaction]
 Step = Callable[[Iterable[YnabTransaction]], Iterable[YnabTransaction]]
@@ -13,19 +19,151 @@ class Pipeline:
     """Runs a sequence of steps over a transaction stream.
 
     Each step receives and returns an iterable of YnabTransactions.
-    Steps are lazy (generator-based) except write_to steps which materialize.
+    Steps are lazy (generator-based) except write_to steps which materialize
+    unless configured with a streaming window.
     """
 
     def __init__(self, steps: list[Step]):
         self.steps = steps
 
     @classmethod
-    def from_config(cls, step_dicts: list[dict], ctx: PipelineContext) -> 'Pipeline':
+    def from_config(cls, pipeline_cfg: PipelineConfig, ctx: PipelineContext, name_prefix: str = '') -> 'Pipeline':
+        """Build a pipeline of the configured execution mode (see config.schema.PipelineConfig).
+        `name_prefix` qualifies step names in profile reports."""
         from .steps import build_steps
-        return cls(build_steps(step_dicts, ctx))
+        steps = build_steps(pipeline_cfg.steps, ctx, name_prefix)
+        match pipeline_cfg.execution:
+            case 'threaded':
+                return ThreadedPipeline(steps, pipeline_cfg.queue_size)
+            case 'async':
+                return AsyncPipeline(steps, pipeline_cfg.queue_size)
+            case _:
+                return Pipeline(steps)
 
-    def run(self) -> list[YnabTransaction]:
+    def run(self, collect: bool = True) -> list[YnabTransaction] | None:
+        """Run all steps. With `collect=False` the resulting stream is drained
+        without being kept in memory, which keeps streaming steps bounded."""
         stream: Iterable[YnabTransaction] = iter([])
         for step in self.steps:
             stream = step(stream)
+        return _consume(stream, collect)
+
+
+class PipelineCancelled(Exception):
+    """Raised in a threaded step whose input was abandoned because another step failed."""
+
+
+class ThreadedPipeline(Pipeline):
+    """Runs each step in its own thread, connected by bounded queues.
+
+    Network-bound reads and uploads overlap with mapping: a step starts on the
+    first transactions while upstream is still fetching the rest, and a full
+    queue blocks its producer, so memory stays bounded by `queue_size` per step.
+    Order is preserved. An exception in any step stops all of them and is
+    re-raised from `run`.
+    """
+
+    # How often blocked threads check whether the run was cancelled, seconds
+    POLL_INTERVAL = 0.1
+
+    def __init__(self, steps: list[Step], queue_size: int = 64):
+        super().__init__(steps)
+        self.queue_size = queue_size
+
+    def run(self, collect: bool = True) -> list[YnabTransaction] | None:
+        cancelled = threading.Event()
+        threads = []
+        stream: Iterable[YnabTransaction] = iter([])
+        for i, step in enumerate(self.steps):
+            out = queue.Queue(self.queue_size)
+            thread = threading.Thread(
+                target=self.__stage, args=(step, stream, out, cancelled),
+                name=f'pipeline-step-{i}', daemon=True)
+            thread.start()
+            threads.append(thread)
+            stream = self.__drain(out, cancelled)
+        try:
+            return _consume(stream, collect)
+        finally:
+            cancelled.set()
+            for thread in threads:
+                thread.join()
+
+    def __stage(self, step: Step, stream: Iterable, out: queue.Queue, cancelled: threading.Event):
+        try:
+            for t in step(stream):
+                if not self.__put(out, t, cancelled):
+                    return
+            end = aio.DONE
+        except BaseException as e:
+            end = aio.Failure(e)
+        self.__put(out, end, cancelled)
+
+    def __put(self, out: queue.Queue, item, cancelled: threading.Event) -> bool:
+        while not cancelled.is_set():
+            try:
+                out.put(item, timeout=self.POLL_INTERVAL)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __drain(self, source: queue.Queue, cancelled: threading.Event) -> Iterator[YnabTransaction]:
+        while True:
+            try:
+                item = source.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                if cancelled.is_set():
+                    raise PipelineCancelled() from None
+                continue
+            if item is aio.DONE:
+                return
+            if isinstance(item, aio.Failure):
+                raise item.error
+            yield item
+
+
+class AsyncPipeline(Pipeline):
+    """Runs steps on an asyncio event loop.
+
+    A step with an `aio` attribute (`AsyncIterable -> AsyncIterable`) runs on
+    the loop itself, e.g. read_from awaits all account fetches concurrently.
+    Other steps, including all registered map/filter methods, keep working:
+    each runs in its own worker thread, bridged by bounded queues. The bank and
+    YNAB clients are synchronous, so their requests run in executor threads.
+    """
+
+    def __init__(self, steps: list[Step], queue_size: int = 64):
+        super().__init__(steps)
+        self.queue_size = queue_size
+
+    def run(self, collect: bool = True) -> list[YnabTransaction] | None:
+        return asyncio.run(self.arun(collect))
+
+    async def arun(self, collect: bool = True) -> list[YnabTransaction] | None:
+        stream: AsyncIterable[YnabTransaction] = aio.empty()
+        stages = []
+        for step in self.steps:
+            if hasattr(step, 'aio'):
+                stream = step.aio(stream)
+            else:
+                stream = aio.run_in_thread(step, stream, self.queue_size)
+            stages.append(stream)
+        result = [] if collect else None
+        try:
+            async for t in stream:
+                if collect:
+                    result.append(t)
+        finally:
+            # A step that stops early or fails leaves its upstream open, so close
+            # every stage, downstream first, while the event loop is still running
+            for stage in reversed(stages):
+                if hasattr(stage, 'aclose'):
+                    await stage.aclose()
+        return result
+
+
+def _consume(stream: Iterable[YnabTransaction], collect: bool) -> list[YnabTransaction] | None:
+    if collect:
         return list(stream)
+    deque(stream, maxlen=0)
@@ -4,20 +4,32 @@ Steps are registered by name and instantiated from YAML config.
 Each step is a callable: Iterable[YnabTransaction] -> Iterable[YnabTransaction].
 
 Registered classes implement `filter(t) -> bool` and/or `map(t) -> YnabTransaction`.
+To amortize lookups over many transactions they may also implement
+`filter_batch(ts) -> list[bool]` and/or `map_batch(ts) -> list[YnabTransaction]`,
+which take precedence and receive windows of `batch_size` transactions.
 """
 
 from pprint import pprint as pp
+from collections import deque
 from collections.abc import Iterable
 from datetime import datetime
+from functools import lru_cache
+import importlib
+import os
+import asyncio
+import copy
+import pickle
+import tempfile
 
-import yaml, re
+import yaml
 
-from utils.exchange_rates import init_rates_cache, Currency
 from model.transaction import YnabTransaction
 from model.configuration import PipelineContext, YnabAccountRef, RegexDict
-from sources import BankApiSource
+from sources import BankApiSource, read_all, read_concurrently, aread_all
 from config.loader import resolve_time_range, compile_pattern
 from filters.transfer_filter import TransferFilter
+from utils.iterables import batched
+from utils import profiling, aio
 import ynab_api
 
 
@@ -25,10 +37,18 @@ import ynab_api
 
 _REGISTRY: dict[str, type] = {}
 
+# Methods with heavy dependencies live in their own modules, imported on first use
+_LAZY_REGISTRY: dict[str, str] = {
+    'convert_to_uah_by_memo': '.currency',
+    'convert_to_eur': '.currency',
+}
+
 
 def register_method(name):
     """Register a pipeline method class by name. The class should implement
-    `filter(self, t) -> bool` and/or `map(self, t) -> YnabTransaction`."""
+    `filter(self, t) -> bool` and/or `map(self, t) -> YnabTransaction`,
+    or their batch variants `filter_batch(self, ts) -> list[bool]` and
+    `map_batch(self, ts) -> list[YnabTransaction]`."""
     def decorator(cls):
         _REGISTRY[name] = cls
         return cls
@@ -39,25 +59,55 @@ def register_method(name):
 
 @register_method('deduplicate_transfers')
 class DeduplicateTransfers:
-    """Removes duplicate transfer transactions between YNAB accounts."""
-    def __init__(self, **kwargs):
-        self._filter = TransferFilter()
+    """Removes duplicate transfer transactions between YNAB accounts.
+    Legs dated up to `days` apart are considered the same transfer."""
+    def __init__(self, days: int = 0, **kwargs):
+        self._filter = TransferFilter(days)
 
     def filter(self, t: YnabTransaction) -> bool:
         return self._filter(t)
 
 
+# Mapping tables are cached by file version, so that steps rebuilt for every
+# run of a long-running process do not reload and recompile unchanged files.
+
+def _mtime(path: str) -> float:
+    return os.stat(path).st_mtime
+
+
+@lru_cache(maxsize=32)
+def _load_payee_map(path: str, mtime: float) -> RegexDict:
+    with open(path) as f:
+        payees_data = yaml.safe_load(f)
+    return RegexDict(
+        (compile_pattern(*regexes), alias)
+        for alias, regexes in payees_data.items()
+        if regexes
+    )
+
+
+@lru_cache(maxsize=32)
+def _load_category_maps(path: str, mtime: float) -> tuple[RegexDict, dict[int, dict]]:
+    with open(path) as f:
+        categories_data = yaml.safe_load(f)
+    by_payee = RegexDict(
+        (compile_pattern(*entry['match']['payee']), entry['category'])
+        for entry in categories_data
+        if entry.get('match', {}).get('payee')
+    )
+    by_mcc = {
+        mcc: entry['category']
+        for entry in categories_data
+        for mcc in entry.get('match', {}).get('mcc', [])
+    }
+    return by_payee, by_mcc
+
+
 @register_method('payee')
 class PayeeMapper:
     """Maps transaction payee using regex aliases from a YAML file."""
     def __init__(self, mappings: str, **kwargs):
-        with open(mappings) as f:
-            payees_data = yaml.safe_load(f)
-        self._payee_map = RegexDict(
-            (compile_pattern(*regexes), alias)
-            for alias, regexes in payees_data.items()
-            if regexes
-        )
+        self._payee_map = _load_payee_map(mappings, _mtime(mappings))
 
     def map(self, t: YnabTransaction) -> YnabTransaction:
         payee_name = t.detail.payee_name or ''
@@ -72,31 +122,30 @@ class CategorizeMapper:
     """Maps transaction category using payee/MCC rules from a YAML file.
     Resolves category_id via YNAB API."""
     def __init__(self, mappings: str, budget: str, ctx: PipelineContext, **kwargs):
-        with open(mappings) as f:
-            categories_data = yaml.safe_load(f)
-        self._by_payee = RegexDict(
-            (compile_pattern(*entry['match']['payee']), entry['category'])
-            for entry in categories_data
-            if entry.get('match', {}).get('payee')
-        )
-        self._by_mcc = {
-            mcc: entry['category']
-            for entry in categories_data
-            for mcc in entry.get('match', {}).get('mcc', [])
-        }
-        budget_cfg = ctx.budgets[budget]
-        self._ynab = ynab_api.SingleBudgetYnabApiWrapper(
-            ynab_api.YnabApiWrapper(budget_cfg.token), budget_cfg.budget_name)
+        self._by_payee, self._by_mcc = _load_category_maps(mappings, _mtime(mappings))
+        self._ynab = ctx.ynab.get_budget(ctx.budgets[budget])
+
+    def _match(self, t: YnabTransaction) -> dict | None:
+        payee_name = t.detail.payee_name or ''
+        mcc = t.bank_transaction.mcc if t.bank_transaction else None
+        return self._by_payee.get(payee_name) or (self._by_mcc.get(mcc) if mcc else None)
 
     def map(self, t: YnabTransaction) -> YnabTransaction:
         if not t.detail.category_id:
-            payee_name = t.detail.payee_name or ''
-            mcc = t.bank_transaction.mcc if t.bank_transaction else None
-            cat = self._by_payee.get(payee_name) or (self._by_mcc.get(mcc) if mcc else None)
+            cat = self._match(t)
             if cat:
                 t.detail.category_id = self._ynab.get_category_id_by_name(cat['group'], cat['name'])
         return t
 
+    def map_batch(self, batch: list[YnabTransaction]) -> list[YnabTransaction]:
+        matched = [(t, cat) for t in batch if not t.detail.category_id and (cat := self._match(t))]
+        if not matched:
+            return batch
+        ids = self._ynab.get_category_ids_by_names({(cat['group'], cat['name']) for _, cat in matched})
+        for t, cat in matched:
+            t.detail.category_id = ids[(cat['group'], cat['name'])]
+        return batch
+
 
 @register_method('change_date')
 class ChangeDateMapper:
@@ -110,118 +159,49 @@ class ChangeDateMapper:
         return t
 
 
-@register_method('convert_to_uah_by_memo')
-class ConvertToUahByMemo:
-    """Filters eligible transactions and converts EUR memo amounts to UAH.
-    Also re-formats memo to "<optional description> <euro sign><amount in {0:,.2f}>".
-    """
-
-    MEMO_RE = re.compile(
-        r'^\s*(?:(?P<text_before>[^\d$€()]+?)'                  # text_before
-        r'\s*[-( ]*\s*)?'                                       # delim and/or '('
-        r'(?P<currency>[€$])?'                                  # currency symbol
-        r'(?P<amount>[\d,]+(?:\.\d{1,2})?)'                     # amount
-        r'(?:\s*[-) ]\s*(?P<text_after>[^\d€()]+?)?)?\s*$')     # delim and/or ')' and text_after
-
-    def __init__(self, **kwargs):
-        self.ex_rate_cache = {}
-
-    def filter(self, t: YnabTransaction) -> bool:
-        if t.detail.transfer_account_id:
-            return False
-        # Skip splits (for now)
-        if t.detail.subtransactions:
-            return False
-        # Skip transactions with any existing amount.
-        # Should be 0 to be eligible for conversion.
-        if t.detail.amount:
-            return False
-        # Match memo and skip different currency.
-        if m := self.MEMO_RE.match(t.detail.memo or ''):
-            return m.group('currency') in (None, '€')
-        return False
-
-    def map(self, t: YnabTransaction) -> YnabTransaction:
-        if not self.filter(t):
-            return t
-
-        m = self.MEMO_RE.match(t.detail.memo or '')
-
-        # Load ex rates cache if needed
-        if t.detail.var_date not in self.ex_rate_cache:
-            self.ex_rate_cache = init_rates_cache(Currency.EUR, t.detail.var_date, datetime.now().date())
-        memo_amount = float(m.group('amount'))
-        # Re-format memo
-        text_before = m.group('text_before') or m.group('text_after') or ''
-        if len(text_before) > 1:
-            text_before = text_before[0].capitalize() + text_before[1:]
-        t.detail.memo = f'{text_before} €{memo_amount:,.2f}'
-        # Convert currency
-        converted_amount = memo_amount * self.ex_rate_cache[t.detail.var_date]
-        # Present in milliunits format
-        t.detail.amount = -int(converted_amount*1000)
-        return t
-
-
-@register_method('convert_to_eur')
-class ConvertToEur:
-    def __init__(self, **kwargs):
-        self.ex_rate_cache = {}
-
-    def map(self, t: YnabTransaction) -> YnabTransaction:
-        def _convert_with_sub(t: YnabTransaction, rate: float):
-            if t.detail.subtransactions:
-                total = 0
-                for subt in t.detail.subtransactions:
-                    subt.amount = int(subt.amount / rate)
-                    total += subt.amount
-                t.detail.amount = total
-            else:
-                t.detail.amount = int(t.detail.amount / rate)
-                
-        
-        m = ConvertToUahByMemo.MEMO_RE.match(t.detail.memo or '')
-        if m and m.group('currency') in (None, '€') and not t.detail.subtransactions:
-            sign = 1 if (t.detail.amount and t.detail.amount > 0) else -1
-            t.detail.amount = int(float(m.group('amount'))*1000) * sign
-            t.detail.memo = (f'{m.group("text_before") or ""} {m.group("text_after") or ""}').strip()
-        else:
-            if t.detail.var_date not in self.ex_rate_cache:
-                self.ex_rate_cache = init_rates_cache(Currency.EUR, t.detail.var_date, datetime.now().date())
-            rate = self.ex_rate_cache[t.detail.var_date]
-            if t.detail.subtransactions:
-                total = 0
-                for subt in t.detail.subtransactions:
-                    subt.amount = int(subt.amount / rate)
-                    total += subt.amount
-                t.detail.amount = total
-            else:
-                t.detail.amount = int(t.detail.amount / rate)
-
-        return t
+# --- Step builders ---
 
+DEFAULT_BATCH_SIZE = 256
 
-# --- Step builders ---
 
-def build_steps(step_dicts: list[dict], ctx: PipelineContext) -> list:
-    """Build executable step callables from pipeline YAML config."""
+def build_steps(step_dicts: list[dict], ctx: PipelineContext, name_prefix: str = '') -> list:
+    """Build executable step callables from pipeline YAML config.
+    `name_prefix` qualifies step names in profile reports (e.g. steps of a tee branch)."""
     steps = []
     for step_dict in step_dicts:
         for step_type, params in step_dict.items():
             match step_type:
                 case 'read_from':
-                    steps.append(_build_read_from(ctx, params))
+                    step = _build_read_from(ctx, params)
                 case 'filter':
-                    steps.append(_build_filter(ctx, params))
+                    step = _build_filter(ctx, params)
                 case 'map':
-                    steps.append(_build_map(ctx, params))
+                    step = _build_map(ctx, params)
                 case 'write_to':
-                    steps.append(_build_write_to(ctx, params))
+                    step = _build_write_to(ctx, params)
+                case 'tee':
+                    step = _build_tee(ctx, params, name_prefix)
                 case _:
                     raise ValueError(f'Unknown pipeline step type: {step_type}')
+            steps.append(profiling.instrument(name_prefix + _step_name(step_type, params), step))
     return steps
 
 
+def _step_name(step_type: str, params) -> str:
+    """Human-readable step name for reports, e.g. 'map:payee' or 'write_to:my_budget'."""
+    if isinstance(params, str):
+        return f'{step_type}:{params}'
+    if 'type' in params:
+        return f'{step_type}:{params["type"]}'
+    if isinstance(params.get('ynab_api'), str):
+        return f'{step_type}:{params["ynab_api"]}'
+    if 'source' in params:
+        return f'{step_type}:{",".join(params["source"])}'
+    if 'branches' in params:
+        return f'{step_type}:{",".join(params["branches"])}'
+    return step_type
+
+
 def _parse_account_mapping(
     mapping_dict: dict[str, str], ctx: PipelineContext,
 ) -> dict[str, YnabAccountRef]:
@@ -242,11 +222,15 @@ def _create_instance(ctx, params):
         kwargs = dict(params)
         name = kwargs.pop('type')
     kwargs['ctx'] = ctx
+    if name not in _REGISTRY and name in _LAZY_REGISTRY:
+        importlib.import_module(_LAZY_REGISTRY[name], __package__)
     return _REGISTRY[name](**kwargs)
 
 
 def _build_read_from_source(ctx: PipelineContext, params: dict):
-    """Build a read_from step that creates transaction streams from bank sources."""
+    """Build a read_from step that creates transaction streams from bank sources.
+    In async pipelines accounts are fetched concurrently, up to `max_workers`
+    at once (see `aread_all`)."""
     from_mapping = params['source']
     tracking_mapping = params.get('tracking', {})
     time_range_cfg = params.get('time_range')
@@ -262,18 +246,33 @@ def _build_read_from_source(ctx: PipelineContext, params: dict):
     )
 
     read_accounts = set(from_mapping.keys())
-    source_names = {key.split('.', 1)[0] for key in read_accounts}
+    # Keep config order of sources so that ordered output is deterministic
+    source_names = list(dict.fromkeys(key.split('.', 1)[0] for key in from_mapping))
+    max_workers = params.get('max_workers')
+    ordered = params.get('ordered', True)
 
-    def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+    def _sources() -> list[BankApiSource]:
         tr = resolve_time_range(time_range_cfg) if time_range_cfg else None
-        for source_name in source_names:
-            if source_name not in ctx.source_configs:
-                continue
-            src = BankApiSource(
+        return [
+            BankApiSource(
                 ctx.source_configs[source_name], transfer_patterns, tr,
-                ynab_mapping, read_accounts)
-            yield from src.read()
+                ynab_mapping, read_accounts, ctx.ynab, ctx.bank_apis)
+            for source_name in source_names
+            if source_name in ctx.source_configs
+        ]
+
+    def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        sources = _sources()
+        if max_workers and max_workers > 1:
+            yield from read_concurrently(sources, max_workers, ordered)
+        else:
+            yield from read_all(sources)
+
+    async def aio_step(stream):
+        async for t in aread_all(_sources(), ordered, max_workers):
+            yield t
 
+    step.aio = aio_step
     return step
 
 
@@ -285,8 +284,7 @@ def _build_read_from_ynab_api(ctx: PipelineContext, params: dict):
         tr = resolve_time_range(time_range_cfg) if time_range_cfg else None
         for budget_key, accounts in params['ynab_api'].items():
             budget = ctx.budgets[budget_key]
-            wrapper = ynab_api.SingleBudgetYnabApiWrapper(
-                ynab_api.YnabApiWrapper(budget.token), budget.budget_name)
+            wrapper = ctx.ynab.get_budget(budget)
             for acc in accounts:
                 for t in wrapper.get_transactions_by_account(acc, tr.start.date()):
                     t.budget = budget
@@ -305,24 +303,40 @@ def _build_read_from(ctx: PipelineContext, params: dict):
         raise ValueError(f'Cannot recognize read_from params: {list(params.keys())}')
 
 
+def _batch_size(params) -> int:
+    return params.get('batch_size', DEFAULT_BATCH_SIZE) if isinstance(params, dict) else DEFAULT_BATCH_SIZE
+
+
 def _build_filter(ctx, params):
-    """Build a filter step from registry."""
+    """Build a filter step from registry.
+    Methods implementing `filter_batch` are fed windows of `batch_size` transactions."""
     instance = _create_instance(ctx, params)
+    batch_size = _batch_size(params)
 
     def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
         return filter(instance.filter, stream)
 
-    return step
+    def batch_step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        for batch in batched(stream, batch_size):
+            yield from (t for t, keep in zip(batch, instance.filter_batch(batch), strict=True) if keep)
+
+    return batch_step if hasattr(instance, 'filter_batch') else step
 
 
 def _build_map(ctx: PipelineContext, params):
-    """Build a map step from registry."""
+    """Build a map step from registry.
+    Methods implementing `map_batch` are fed windows of `batch_size` transactions."""
     instance = _create_instance(ctx, params)
+    batch_size = _batch_size(params)
 
     def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
         return map(instance.map, stream)
 
-    return step
+    def batch_step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        for batch in batched(stream, batch_size):
+            yield from instance.map_batch(batch)
+
+    return batch_step if hasattr(instance, 'map_batch') else step
 
 
 def _build_write_to(ctx: PipelineContext, params: dict):
@@ -330,24 +344,23 @@ def _build_write_to(ctx: PipelineContext, params: dict):
 
     When a transaction's source budget differs from the destination,
     budget-local IDs are re-mapped by name and transaction IDs are cleared.
+
+    By default the whole stream is materialized before uploading. With `window`
+    set, the stream is uploaded window by window and each window is passed
+    downstream once YNAB confirms it, so memory is bounded by the window size.
+    In async pipelines the uploads run in an executor thread.
     """
     budget_key = params['ynab_api']
     dest_budget = ctx.budgets[budget_key]
     timestamp_file = params.get('timestamp')
-
-    _src_wrapper_cache: dict[str, ynab_api.SingleBudgetYnabApiWrapper] = {}
-
-    def _get_src_wrapper(budget):
-        key = f'{budget.token}:{budget.budget_name}'
-        if key not in _src_wrapper_cache:
-            _src_wrapper_cache[key] = ynab_api.SingleBudgetYnabApiWrapper(
-                ynab_api.YnabApiWrapper(budget.token), budget.budget_name)
-        return _src_wrapper_cache[key]
+    batch_size = params.get('batch_size', 500)
+    # Streaming mode: upload every `window` transactions as they arrive
+    window = params.get('window')
 
     def _remap_cross_budget(t: YnabTransaction, dest_wrapper):
         """Re-map budget-local IDs from source to destination budget."""
         d = t.detail
-        src_wrapper = _get_src_wrapper(t.budget)
+        src_wrapper = ctx.ynab.get_budget(t.budget)
 
         # Re-map account
         if d.account_name:
@@ -399,11 +412,8 @@ def _build_write_to(ctx: PipelineContext, params: dict):
                 if not sub.transfer_account_id:
                     sub.payee_id = None
 
-    def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
-        wrapper = ynab_api.SingleBudgetYnabApiWrapper(
-            ynab_api.YnabApiWrapper(dest_budget.token), dest_budget.budget_name)
-        transactions = list(stream)
-
+    def _write(transactions: list[YnabTransaction], wrapper) -> int:
+        """Remap and upload a list of transactions. Returns the number of uploaded ones."""
         for t in transactions:
             if t.budget and t.budget.budget_name != dest_budget.budget_name:
                 _remap_cross_budget(t, wrapper)
@@ -413,24 +423,124 @@ def _build_write_to(ctx: PipelineContext, params: dict):
 
         if to_create:
             print(f'Creating {len(to_create)} transactions in "{dest_budget.budget_name}"...')
-            result = wrapper.create_transactions(to_create)
-            if result:
-                print(f'-- Created: {len(result.transaction_ids)}')
+            n = _upload_in_chunks(wrapper.create_transactions, to_create, batch_size)
+            print(f'-- Created: {n}')
 
         if to_update:
             print(f'Updating {len(to_update)} transactions in "{dest_budget.budget_name}"...')
-            result = wrapper.update_transactions(to_update)
-            if result:
-                print(f'-- Updated: {len(result.transaction_ids)}')
+            n = _upload_in_chunks(wrapper.update_transactions, to_update, batch_size)
+            print(f'-- Updated: {n}')
 
-        if not to_create and not to_update:
-            print('-- Nothing to import')
+        return len(to_create) + len(to_update)
 
+    def _save_timestamp():
         if timestamp_file:
             with open(timestamp_file, 'w') as f:
                 f.write(datetime.now().astimezone().isoformat())
             print(f'Saved timestamp to {timestamp_file}')
 
+    def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        wrapper = ctx.ynab.get_budget(dest_budget)
+        transactions = list(stream)
+
+        if not _write(transactions, wrapper):
+            print('-- Nothing to import')
+        _save_timestamp()
+
         return iter(transactions)
 
-    return step
\ No newline at end of file
+    def streaming_step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        wrapper = ctx.ynab.get_budget(dest_budget)
+        total = 0
+        for transactions in batched(stream, window):
+            total += _write(transactions, wrapper)
+            yield from transactions
+
+        if not total:
+            print('-- Nothing to import')
+        _save_timestamp()
+
+    async def aio_step(stream):
+        wrapper = await asyncio.to_thread(ctx.ynab.get_budget, dest_budget)
+        total = 0
+        async for transactions in aio.batched(stream, window):
+            total += await asyncio.to_thread(_write, transactions, wrapper)
+            for t in transactions:
+                yield t
+
+        if not total:
+            print('-- Nothing to import')
+        _save_timestamp()
+
+    selected = streaming_step if window else step
+    selected.aio = aio_step
+    return selected
+
+
+def _upload_in_chunks(upload, transactions: list[YnabTransaction], batch_size: int) -> int:
+    """Upload transactions in requests of at most `batch_size` items.
+    Returns the number of transactions confirmed by YNAB.
+
+    Chunks are sent one after another; a failing chunk stops the upload,
+    and chunks sent before it stay in YNAB.
+    """
+    n_chunks = -(-len(transactions) // batch_size)
+    confirmed = 0
+    for i, chunk in enumerate(batched(transactions, batch_size), 1):
+        try:
+            result = upload(chunk)
+        except Exception:
+            print(f'-- Chunk {i}/{n_chunks} failed, {confirmed} transactions were uploaded before it')
+            raise
+        n = len(result.transaction_ids) if result else 0
+        confirmed += n
+        if n_chunks > 1:
+            print(f'-- Chunk {i}/{n_chunks}: {n} of {len(chunk)}')
+    return confirmed
+
+
+def _build_tee(ctx: PipelineContext, params: dict, name_prefix: str = ''):
+    """Build a tee step that replays its input into several named branches.
+
+    Each branch is a list of steps (e.g. maps and a write_to into another budget)
+    that gets its own copies of the transactions, so sources are read once for
+    all of them. Branches run one after another once the input is complete;
+    then the input is passed downstream unchanged. The input is kept in memory,
+    or with `spool` pickled to a temporary file.
+    """
+    branches = {
+        name: build_steps(step_dicts, ctx, f'{name_prefix}{name}/')
+        for name, step_dicts in params['branches'].items()
+    }
+    spool = params.get('spool', False)
+
+    def _run_branch(name: str, steps: list, stream: Iterable[YnabTransaction]):
+        print(f'Running branch: {name}')
+        for s in steps:
+            stream = s(stream)
+        deque(stream, maxlen=0)
+
+    def step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        transactions = list(stream)
+        for name, steps in branches.items():
+            _run_branch(name, steps, (copy.deepcopy(t) for t in transactions))
+        return iter(transactions)
+
+    def spooled_step(stream: Iterable[YnabTransaction]) -> Iterable[YnabTransaction]:
+        with tempfile.TemporaryFile() as f:
+            for t in stream:
+                pickle.dump(t, f, pickle.HIGHEST_PROTOCOL)
+
+            def replay() -> Iterable[YnabTransaction]:
+                f.seek(0)
+                while True:
+                    try:
+                        yield pickle.load(f)
+                    except EOFError:
+                        return
+
+            for name, steps in branches.items():
+                _run_branch(name, steps, replay())
+            yield from replay()
+
+    return spooled_step if spool else step
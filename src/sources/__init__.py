@@ -1,4 +1,4 @@
 """Transaction source abstractions."""
 
 from .base import YnabTransactionSource
-from .bank_api import BankApiSource
+from .bank_api import BankApiSource, read_all, read_concurrently, aread_all
@@ -1,14 +1,17 @@
 """BankApiSource — wraps bank API and converts BankTransactions to YnabTransactions."""
 
-import bank_api as bank_api_factory
+from bank_api import BankApiPool
 import ynab_openapi as ynab
 from .base import YnabTransactionSource
 from model.transaction import BankTransaction, YnabTransaction
 from model.configuration import (
-    BankApiConfiguration, RegexDict, TimeRange, YnabAccountRef,
+    BankAccountConfiguration, BankApiConfiguration, RegexDict, TimeRange, YnabAccountRef,
 )
-from ynab_api import YnabApiWrapper
-from collections.abc import Iterable
+from ynab_api import YnabApiPool
+from utils import profiling
+from collections.abc import AsyncIterator, Iterable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 
 
 class BankApiSource(YnabTransactionSource):
@@ -27,46 +30,66 @@ class BankApiSource(YnabTransactionSource):
         time_range: TimeRange,
         ynab_mapping: dict[str, YnabAccountRef],
         read_accounts: set[str],
+        ynab_pool: YnabApiPool,
+        bank_apis: BankApiPool,
     ):
         self.api_conf = api_conf
         self.transfer_patterns = transfer_patterns
         self.time_range = time_range
         self.ynab_mapping = ynab_mapping
         self.read_accounts = read_accounts
-        self._api = None
-        self._ynab_wrappers: dict[str, YnabApiWrapper] = {}
+        self.ynab_pool = ynab_pool
+        self.bank_apis = bank_apis
 
     @property
     def api(self):
-        if self._api is None:
-            self._api = bank_api_factory.create(self.api_conf)
-        return self._api
-
-    def _get_ynab_wrapper(self, budget_token: str) -> YnabApiWrapper:
-        if budget_token not in self._ynab_wrappers:
-            self._ynab_wrappers[budget_token] = YnabApiWrapper(budget_token)
-        return self._ynab_wrappers[budget_token]
+        return self.bank_apis.get(self.api_conf)
 
     def _resolve_ynab_account(self, ref: YnabAccountRef):
         """Resolve YNAB account from account ref."""
-        wrapper = self._get_ynab_wrapper(ref.budget.token)
-        budget_id = wrapper.get_budget_by_name(ref.budget.budget_name).id
-        return wrapper.get_account_by_name(budget_id, ref.name)
+        return self.ynab_pool.get_budget(ref.budget).get_account_by_name(ref.name)
 
-    def read(self) -> Iterable[YnabTransaction]:
-        for account in self.api_conf.accounts:
-            key = f'{account.source_name}.{account.name}'
-            if key not in self.read_accounts:
-                continue
-            ref = self.ynab_mapping[key]
-            print(f'{key} --> {ref.budget.budget_name}.{ref.name}')
+    @property
+    def accounts(self) -> list[BankAccountConfiguration]:
+        """Configured accounts of this source that should be read."""
+        return [a for a in self.api_conf.accounts
+                if f'{a.source_name}.{a.name}' in self.read_accounts]
+
+    def request(self, account: BankAccountConfiguration) -> Iterable[BankTransaction]:
+        """Request raw bank transactions of a single account.
+        Bank APIs that queue requests (Monobank) return results lazily,
+        so requesting all accounts up front lets them be fetched together."""
+        key = f'{account.source_name}.{account.name}'
+        ref = self.ynab_mapping[key]
+        print(f'{key} --> {ref.budget.budget_name}.{ref.name}')
+        with profiling.timed('source', key):
             raw_trans = self.api.request_statements_for_time_range(
                 account.iban, self.time_range.start, self.time_range.end)
-            if raw_trans:
-                for t in raw_trans:
-                    t.transfer_account = self.transfer_patterns.get(
-                        t.description, condition=lambda a, acc=account: a is not acc)
-                    yield self._to_ynab(t, key)
+        return profiling.timed_iter('source', key, raw_trans or [])
+
+    def request_all(self) -> list[tuple[BankAccountConfiguration, Iterable[BankTransaction]]]:
+        return [(account, self.request(account)) for account in self.accounts]
+
+    def fetch(self, account: BankAccountConfiguration) -> list[BankTransaction]:
+        """Fetch raw bank transactions of a single account.
+        Only talks to the bank API, so it is safe to call from worker threads."""
+        return list(self.request(account))
+
+    def convert(self, account: BankAccountConfiguration,
+                raw_trans: Iterable[BankTransaction]) -> Iterable[YnabTransaction]:
+        """Detect transfers and convert fetched bank transactions of an account."""
+        key = f'{account.source_name}.{account.name}'
+        for t in raw_trans:
+            t.transfer_account = self.transfer_patterns.get(
+                t.description, condition=lambda a, acc=account: a is not acc)
+            yield self._to_ynab(t, key)
+
+    def read(self) -> Iterable[YnabTransaction]:
+        for account, raw_trans in self.request_all():
+            yield from self.convert(account, raw_trans)
+
+    def aread(self) -> AsyncIterator[YnabTransaction]:
+        return aread_all([self])
 
     def _to_ynab(self, t: BankTransaction, source_account_key: str) -> YnabTransaction:
         """Convert a BankTransaction to YnabTransaction with resolved YNAB IDs."""
@@ -100,3 +123,62 @@ class BankApiSource(YnabTransactionSource):
         )
 
         return YnabTransaction(detail=detail, budget=ref.budget, bank_transaction=t)
+
+
+def read_all(sources: Iterable[BankApiSource]) -> Iterable[YnabTransaction]:
+    """Read sources one after another, but request all their accounts first,
+    so that queued bank requests of different sources overlap."""
+    requested = [(src, src.request_all()) for src in sources]
+    for src, accounts in requested:
+        for account, raw_trans in accounts:
+            yield from src.convert(account, raw_trans)
+
+
+def read_concurrently(
+    sources: Iterable[BankApiSource], max_workers: int, ordered: bool = True,
+) -> Iterable[YnabTransaction]:
+    """Fetch all accounts of all sources in a thread pool and merge the streams.
+
+    Bank fetches run in parallel; conversion to YnabTransactions (which resolves
+    YNAB ids) stays in the calling thread. With `ordered`, accounts are yielded
+    in configuration order, otherwise in order of completion.
+    """
+    jobs = [(src, account) for src in sources for account in src.accounts]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(src.fetch, account): (src, account)
+                   for src, account in jobs}
+        done = futures if ordered else as_completed(futures)
+        for future in done:
+            src, account = futures[future]
+            yield from src.convert(account, future.result())
+
+
+# Accounts fetched at once by `aread_all` unless configured otherwise
+AREAD_MAX_WORKERS = 8
+
+
+async def aread_all(
+    sources: Iterable[BankApiSource], ordered: bool = True, max_workers: int | None = None,
+) -> AsyncIterator[YnabTransaction]:
+    """Fetch all accounts of all sources concurrently on the running event loop.
+
+    The bank clients are synchronous, so each fetch and conversion runs in an
+    executor thread; at most `max_workers` accounts (default AREAD_MAX_WORKERS)
+    are in flight at once. With `ordered`, accounts are yielded in configuration
+    order, otherwise in order of completion.
+    """
+    limit = asyncio.Semaphore(max_workers or AREAD_MAX_WORKERS)
+
+    async def fetch(src: BankApiSource, account: BankAccountConfiguration):
+        async with limit:
+            raw_trans = await asyncio.to_thread(src.fetch, account)
+            return await asyncio.to_thread(lambda: list(src.convert(account, raw_trans)))
+
+    tasks = [asyncio.ensure_future(fetch(src, account)) for src in sources for account in src.accounts]
+    try:
+        for task in tasks if ordered else asyncio.as_completed(tasks):
+            for t in await task:
+                yield t
+    finally:
+        for task in tasks:
+            task.cancel()
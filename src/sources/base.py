@@ -1,9 +1,10 @@
 """YnabTransactionSource — abstract base for all transaction sources."""
 
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import AsyncIterator, Iterable
 
 from model.transaction import YnabTransaction
+from utils import aio
 
 
 class YnabTransactionSource(ABC):
@@ -13,5 +14,9 @@ class YnabTransactionSource(ABC):
     def read(self) -> Iterable[YnabTransaction]:
         ...
 
+    def aread(self) -> AsyncIterator[YnabTransaction]:
+        """Async variant of `read`. By default `read` runs in a worker thread."""
+        return aio.iterate_in_thread(self.read)
+
     # TODO: YnabBudgetSource — read from another YNAB budget
     # TODO: FileSource — read from CSV/JSON backup
@@ -0,0 +1,109 @@
+"""Bridges between synchronous iterables and asyncio.
+
+The bank and YNAB clients are synchronous, so async pipelines run them in
+worker threads and exchange transactions through bounded asyncio queues.
+"""
+
+import asyncio
+import threading
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+
+# How often a cancelled bridge checks whether its worker thread has stopped, seconds
+POLL_INTERVAL = 0.05
+
+
+class Cancelled(Exception):
+    """Raised in a worker thread whose consumer went away."""
+
+
+class Failure:
+    """Marks the end of a stream caused by an exception, passed between threads."""
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+# Marks the regular end of a stream passed between threads
+DONE = object()
+
+
+async def empty() -> AsyncIterator:
+    return
+    yield
+
+
+async def batched(stream: AsyncIterable, n: int | None) -> AsyncIterator[list]:
+    """Async `utils.iterables.batched`. With `n` None the whole stream is one batch."""
+    batch = []
+    async for item in stream:
+        batch.append(item)
+        if n and len(batch) == n:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iterate_in_thread(iterable: Callable[[], Iterable], queue_size: int = 64) -> AsyncIterator:
+    """Iterate a synchronous iterable (created by `iterable()`) in a worker thread."""
+    return run_in_thread(lambda _: iterable(), empty(), queue_size)
+
+
+async def run_in_thread(
+    fn: Callable[[Iterable], Iterable], stream: AsyncIterable, queue_size: int = 64,
+) -> AsyncIterator:
+    """Run a synchronous stream transformation `fn` in a dedicated thread.
+
+    `fn` receives a blocking iterator over `stream` and its output is yielded
+    back on the event loop. Queues on both sides are bounded, so a slow
+    consumer holds back the thread and the upstream. An exception in `fn`
+    is re-raised here; if the consumer stops early, the thread is cancelled.
+    """
+    loop = asyncio.get_running_loop()
+    out = asyncio.Queue(queue_size)
+    cancelled = threading.Event()
+    upstream = aiter(stream)
+
+    def pull() -> Iterator:
+        while True:
+            if cancelled.is_set():
+                raise Cancelled()
+            try:
+                yield asyncio.run_coroutine_threadsafe(anext(upstream), loop).result()
+            except StopAsyncIteration:
+                return
+
+    def push(item) -> bool:
+        if cancelled.is_set():
+            return False
+        asyncio.run_coroutine_threadsafe(out.put(item), loop).result()
+        return True
+
+    def work():
+        try:
+            for item in fn(pull()):
+                if not push(item):
+                    return
+            end = DONE
+        except BaseException as e:
+            end = Failure(e)
+        push(end)
+
+    thread = threading.Thread(target=work, name=f'aio-{getattr(fn, "__name__", "step")}', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = await out.get()
+            if item is DONE:
+                return
+            if isinstance(item, Failure):
+                raise item.error
+            yield item
+    finally:
+        cancelled.set()
+        # Keep serving the thread's pending puts and pulls until it notices
+        while thread.is_alive():
+            while not out.empty():
+                out.get_nowait()
+            await asyncio.sleep(POLL_INTERVAL)
+        if hasattr(upstream, 'aclose'):
+            await upstream.aclose()
@@ -1,12 +1,17 @@
-"""NBU exchange rate fetching with file-based caching."""
+"""NBU exchange rate fetching with a persistent, interval-aware cache."""
 
-import json
+import bisect
+import sqlite3
+import threading
+import time
 import datetime as dt
 from enum import StrEnum
+from pathlib import Path
 
-import requests
+from utils import profiling
 
-RATES_CACHE_FILE = 'rates_cache.json'
+# File name of the rate store under cache_dir
+RATES_CACHE_FILE = 'rates_cache.sqlite'
 
 
 class Currency(StrEnum):
@@ -14,31 +19,178 @@ class Currency(StrEnum):
 
 
 def _request_ex_rates(date_start: dt.date, date_stop: dt.date, currency: Currency) -> dict[dt.date, float]:
+    # Imported on first request: the config loader imports this module on every run
+    import requests
     url = (
         f'https://bank.gov.ua/NBU_Exchange/exchange_site'
         f'?start={date_start.year}{date_start.month:02}{date_start.day:02}'
         f'&end={date_stop.year}{date_stop.month:02}{date_stop.day:02}'
         f'&valcode={currency}&sort=exchangedate&order=desc&json'
     )
-    resp = requests.get(url)
+    with profiling.timed('http', 'nbu'):
+        resp = requests.get(url)
     return {dt.datetime.strptime(i['exchangedate'], '%d.%m.%Y').date(): float(i['rate_per_unit']) for i in resp.json()}
 
 
-def init_rates_cache(currency: Currency, date_start: dt.date, date_stop: dt.date):
-    cache = {}
-    try:
-        with open(RATES_CACHE_FILE) as f:
-            cache = {dt.datetime.strptime(k, '%Y-%m-%d').date(): v for k, v in json.load(f).items()}
-        sorted_cache_dates = sorted(cache)
-        if date_start in cache and date_stop in cache:
-            print(f'Ex rates cache: loaded {len(cache)} entries from {sorted_cache_dates[0]} to {sorted_cache_dates[-1]}')
-            return cache
-    except (FileNotFoundError, json.JSONDecodeError):
-        pass
-
-    print(f'Ex rates cache: requesting rates from {date_start} to {date_stop}')
-    cache |= _request_ex_rates(date_start, date_stop, currency)
-    with open(RATES_CACHE_FILE, 'w') as f:
-        json.dump({str(k): v for k, v in cache.items()}, f, default=str)
-    print(f'Ex rates cache: stored {len(cache)} entries')
-    return cache
+class RateTable(dict):
+    """Mapping date -> rate. A date without a published rate (weekend, holiday,
+    not yet published) gets the latest earlier rate. Datetime keys are looked up
+    by their date, so it also works with `pd.Series.map`."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__days = None      # sorted keys, rebuilt after the table changes
+
+    def __setitem__(self, day, rate):
+        super().__setitem__(day, rate)
+        self.__days = None
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.__days = None
+
+    def __missing__(self, day):
+        if isinstance(day, dt.datetime):
+            day = day.date()
+            if day in self:
+                return self[day]
+        days = self.__days
+        if days is None:
+            days = self.__days = sorted(self)
+        i = bisect.bisect_right(days, day)
+        if i == 0:
+            raise KeyError(day)
+        return self[days[i - 1]]
+
+
+class RateStore:
+    """SQLite store of exchange rates that remembers which date intervals
+    were requested from the NBU, so only missing sub-ranges are fetched.
+
+    Past days are covered for good once requested. Today's rate may not be
+    published yet, so today is only considered checked for `RECHECK_SECONDS`.
+    """
+
+    # How far back to look for a fallback rate before the first requested date
+    FALLBACK_DAYS = 10
+    # How long a request for days without a final rate (today) is reused, seconds
+    RECHECK_SECONDS = 3600
+
+    __default = None
+    __default_path = ':memory:'
+    __default_lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, cache_dir: str | None):
+        """Keep the shared store under `cache_dir`, or in memory if it is not set."""
+        path = str(Path(cache_dir) / RATES_CACHE_FILE) if cache_dir else ':memory:'
+        with cls.__default_lock:
+            if path != cls.__default_path:
+                cls.__default, cls.__default_path = None, path
+
+    @classmethod
+    def default(cls) -> 'RateStore':
+        """Store shared by the whole process, see `configure`."""
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls(cls.__default_path)
+            return cls.__default
+
+    def __init__(self, path: str):
+        self.__lock = threading.Lock()
+        if path != ':memory:':
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.__db = sqlite3.connect(path, check_same_thread=False)
+        with self.__db:
+            self.__db.execute('''CREATE TABLE IF NOT EXISTS rates (
+                currency TEXT, date TEXT, rate REAL, PRIMARY KEY (currency, date))''')
+            self.__db.execute('''CREATE TABLE IF NOT EXISTS coverage (
+                currency TEXT, start TEXT, end TEXT)''')
+        self.__tables: dict[Currency, RateTable] = {}
+        # currency -> [(start, end, checked_at)] of recent requests for days without a final rate
+        self.__checked: dict[Currency, list[tuple[dt.date, dt.date, float]]] = {}
+
+    def __coverage(self, currency: Currency) -> list[tuple[dt.date, dt.date]]:
+        coverage = [(dt.date.fromisoformat(s), dt.date.fromisoformat(e)) for s, e in self.__db.execute(
+            'SELECT start, end FROM coverage WHERE currency = ?', (currency,))]
+        now = time.monotonic()
+        checked = [c for c in self.__checked.get(currency, []) if now - c[2] <= self.RECHECK_SECONDS]
+        self.__checked[currency] = checked
+        return sorted(coverage + [(start, end) for start, end, _ in checked])
+
+    def __gaps(self, currency: Currency, start: dt.date, end: dt.date) -> list[tuple[dt.date, dt.date]]:
+        gaps = []
+        day = dt.timedelta(days=1)
+        for c_start, c_end in self.__coverage(currency):
+            if c_end < start:
+                continue
+            if c_start > end:
+                break
+            if c_start > start:
+                gaps.append((start, c_start - day))
+            start = max(start, c_end + day)
+        if start <= end:
+            gaps.append((start, end))
+        return gaps
+
+    def __add_coverage(self, currency: Currency, start: dt.date, end: dt.date):
+        intervals = [(dt.date.fromisoformat(s), dt.date.fromisoformat(e)) for s, e in self.__db.execute(
+            'SELECT start, end FROM coverage WHERE currency = ?', (currency,))] + [(start, end)]
+        intervals.sort()
+        merged = [intervals[0]]
+        for c_start, c_end in intervals[1:]:
+            if c_start <= merged[-1][1] + dt.timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], c_end))
+            else:
+                merged.append((c_start, c_end))
+        self.__db.execute('DELETE FROM coverage WHERE currency = ?', (currency,))
+        self.__db.executemany('INSERT INTO coverage VALUES (?, ?, ?)',
+            ((currency, s.isoformat(), e.isoformat()) for s, e in merged))
+
+    def __table(self, currency: Currency) -> RateTable:
+        if currency not in self.__tables:
+            self.__tables[currency] = RateTable(
+                (dt.date.fromisoformat(d), r) for d, r in self.__db.execute(
+                    'SELECT date, rate FROM rates WHERE currency = ?', (currency,)))
+        return self.__tables[currency]
+
+    def prefetch(self, currency: Currency, start: dt.date, end: dt.date):
+        """Make sure rates of [start, end] are stored, requesting only missing sub-ranges."""
+        with self.__lock:
+            table = self.__table(currency)
+            for gap_start, gap_end in self.__gaps(currency, start - dt.timedelta(days=self.FALLBACK_DAYS), end):
+                print(f'Ex rates cache: requesting rates from {gap_start} to {gap_end}')
+                rates = _request_ex_rates(gap_start, gap_end, currency)
+                table.update(rates)
+                with self.__db:
+                    self.__db.executemany('INSERT OR REPLACE INTO rates VALUES (?, ?, ?)',
+                        ((currency, d.isoformat(), r) for d, r in rates.items()))
+                    # Rates for today may not be published yet: only past days count as covered
+                    covered_end = min(gap_end, dt.date.today() - dt.timedelta(days=1))
+                    if gap_start <= covered_end:
+                        self.__add_coverage(currency, gap_start, covered_end)
+                if covered_end < gap_end:
+                    self.__checked.setdefault(currency, []).append(
+                        (max(gap_start, covered_end + dt.timedelta(days=1)), gap_end, time.monotonic()))
+
+    def rates(self, currency: Currency, start: dt.date, end: dt.date) -> RateTable:
+        """All known rates of a currency, with [start, end] prefetched."""
+        self.prefetch(currency, start, end)
+        return self.__table(currency)
+
+    def rates_for(self, currency: Currency, days: list[dt.date]) -> list[float]:
+        """Rates for a batch of days, prefetched with a single range request."""
+        self.prefetch(currency, min(days), max(days))
+        table = self.__table(currency)
+        return [table[d] for d in days]
+
+    def rate(self, currency: Currency, day: dt.date) -> float:
+        """Rate for a day, or the latest earlier one if none was published that day."""
+        table = self.__table(currency)
+        if day not in table:
+            self.prefetch(currency, day, day)
+        return table[day]
+
+
+def init_rates_cache(currency: Currency, date_start: dt.date, date_stop: dt.date) -> RateTable:
+    return RateStore.default().rates(currency, date_start, date_stop)
@@ -0,0 +1,11 @@
+"""Helpers for working with lazy transaction streams."""
+
+from collections.abc import Iterable, Iterator
+from itertools import islice
+
+
+def batched(iterable: Iterable, n: int) -> Iterator[list]:
+    """Split an iterable into lists of length n. The last one may be shorter."""
+    it = iter(iterable)
+    while batch := list(islice(it, n)):
+        yield batch
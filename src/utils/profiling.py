@@ -0,0 +1,210 @@
+"""Optional run profiling: per-step stream statistics and timers for slow calls.
+
+Disabled unless `enable()` is called; `instrument` and `timed` are no-ops then.
+"""
+
+import json
+import threading
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+
+
+@dataclass
+class StepStats:
+    name: str
+    items_in: int = 0
+    items_out: int = 0
+    seconds: float = 0.0    # time spent in the step itself, without upstream steps
+
+    @property
+    def throughput(self) -> float:
+        return self.items_out / self.seconds if self.seconds else 0.0
+
+
+@dataclass
+class TimerStats:
+    category: str           # e.g. 'http', 'parse', 'source'
+    label: str              # e.g. 'ynab', 'monobank', source name
+    seconds: float = 0.0
+    calls: int = 0
+
+
+class Profiler:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.steps: list[StepStats] = []
+        self.timers: dict[tuple[str, str], TimerStats] = {}
+        self.__lock = threading.Lock()
+
+    def instrument(self, name: str, step: Callable[[Iterable], Iterable]) -> Callable[[Iterable], Iterable]:
+        """Wrap a pipeline step to count items in/out and measure its own time.
+        The `aio` variant of a step, if any, is wrapped too and reports into the same stats."""
+        stats = StepStats(name)
+        self.steps.append(stats)
+        wrapper = self.__instrument_sync(stats, step)
+        if hasattr(step, 'aio'):
+            wrapper.aio = self.__instrument_async(stats, step.aio)
+        return wrapper
+
+    @staticmethod
+    def __instrument_sync(stats: StepStats, step: Callable[[Iterable], Iterable]) -> Callable[[Iterable], Iterable]:
+        upstream_time = 0.0
+
+        def count_in(stream: Iterable) -> Iterator:
+            nonlocal upstream_time
+            it = iter(stream)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+                finally:
+                    upstream_time += time.perf_counter() - t0
+                stats.items_in += 1
+                yield item
+
+        def wrapper(stream: Iterable) -> Iterator:
+            t0 = time.perf_counter()
+            it = iter(step(count_in(stream)))
+            total = time.perf_counter() - t0
+            try:
+                while True:
+                    t0 = time.perf_counter()
+                    try:
+                        item = next(it)
+                    except StopIteration:
+                        return
+                    finally:
+                        total += time.perf_counter() - t0
+                        stats.seconds = total - upstream_time
+                    stats.items_out += 1
+                    yield item
+            finally:
+                stats.seconds = total - upstream_time
+
+        return wrapper
+
+    @staticmethod
+    def __instrument_async(
+        stats: StepStats, step: Callable[[AsyncIterable], AsyncIterable],
+    ) -> Callable[[AsyncIterable], AsyncIterable]:
+        """Like the sync wrapper; times are wall-clock time spent awaiting the step,
+        so they include waits for other tasks on the event loop."""
+        upstream_time = 0.0
+
+        async def count_in(stream: AsyncIterable) -> AsyncIterator:
+            nonlocal upstream_time
+            it = aiter(stream)
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = await anext(it)
+                except StopAsyncIteration:
+                    return
+                finally:
+                    upstream_time += time.perf_counter() - t0
+                stats.items_in += 1
+                yield item
+
+        async def wrapper(stream: AsyncIterable) -> AsyncIterator:
+            it = aiter(step(count_in(stream)))
+            total = 0.0
+            try:
+                while True:
+                    t0 = time.perf_counter()
+                    try:
+                        item = await anext(it)
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        total += time.perf_counter() - t0
+                        stats.seconds = total - upstream_time
+                    stats.items_out += 1
+                    yield item
+            finally:
+                if hasattr(it, 'aclose'):
+                    await it.aclose()
+                stats.seconds = total - upstream_time
+
+        return wrapper
+
+    def add_time(self, category: str, label: str, seconds: float):
+        with self.__lock:
+            stats = self.timers.setdefault((category, label), TimerStats(category, label))
+            stats.seconds += seconds
+            stats.calls += 1
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def total_seconds(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def report(self) -> dict:
+        return {
+            'total_seconds': self.total_seconds,
+            'steps': [asdict(s) | {'throughput': s.throughput} for s in self.steps],
+            'timers': [asdict(t) for t in self.timers.values()],
+        }
+
+    def print_table(self):
+        print(f'\nProfile (total {self.total_seconds:.2f}s)')
+        print(f'{"step":<40} {"in":>8} {"out":>8} {"seconds":>9} {"items/s":>10}')
+        for s in self.steps:
+            print(f'{s.name:<40} {s.items_in:>8} {s.items_out:>8} {s.seconds:>9.2f} {s.throughput:>10.1f}')
+        print(f'\n{"timer":<40} {"calls":>8} {"seconds":>9}')
+        for t in sorted(self.timers.values(), key=lambda t: -t.seconds):
+            print(f'{t.category + ":" + t.label:<40} {t.calls:>8} {t.seconds:>9.2f}')
+
+    def write(self, path: str):
+        with open(path, 'w') as f:
+            json.dump(self.report(), f, indent=2)
+
+
+_profiler: Profiler | None = None
+
+
+def enable() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def instrument(name: str, step: Callable[[Iterable], Iterable]) -> Callable[[Iterable], Iterable]:
+    return _profiler.instrument(name, step) if _profiler else step
+
+
+@contextmanager
+def timed(category: str, label: str):
+    """Accumulate the time of the enclosed block under (category, label)."""
+    if not _profiler:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profiler.add_time(category, label, time.perf_counter() - t0)
+
+
+def timed_iter(category: str, label: str, iterable: Iterable) -> Iterable:
+    """Like `timed`, but accumulates the time spent producing each item of a lazy iterable."""
+    if not _profiler:
+        return iterable
+    return _timed_iter(category, label, iterable)
+
+
+def _timed_iter(category, label, iterable):
+    it = iter(iterable)
+    while True:
+        with timed(category, label):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
@@ -0,0 +1,27 @@
+"""Client-side request rate limiting."""
+
+import threading
+import time
+
+
+class TokenBucket:
+    """Allows bursts of up to `capacity` requests, refilled evenly over `period` seconds.
+    `acquire` blocks until a token is available. Safe to share between threads."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.__tokens = float(capacity)
+        self.__updated = time.monotonic()
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        with self.__lock:
+            now = time.monotonic()
+            self.__tokens = min(self.capacity, self.__tokens + (now - self.__updated) * self.rate)
+            self.__updated = now
+            wait = (1 - self.__tokens) / self.rate if self.__tokens < 1 else 0
+            # Reserve the token now: concurrent callers queue up behind it
+            self.__tokens -= 1
+        if wait > 0:
+            time.sleep(wait)
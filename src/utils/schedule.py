@@ -0,0 +1,113 @@
+"""Run schedules for the long-running mode: fixed intervals and cron expressions.
+
+Times are naive local datetimes.
+"""
+
+import re
+import datetime as dt
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value: str | float) -> float:
+    """Seconds of a duration given as a number of seconds or a string like '90s', '15m', '1h', '1d'."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*', value)
+    if not match:
+        raise ValueError(f'Invalid duration: {value!r}')
+    return float(match[1]) * _DURATION_UNITS[match[2] or 's']
+
+
+class Interval:
+    """Runs every `seconds`, counted from the previous run."""
+
+    def __init__(self, seconds: float):
+        if seconds <= 0:
+            raise ValueError(f'Interval must be positive: {seconds}')
+        self.seconds = seconds
+
+    def next_after(self, t: dt.datetime) -> dt.datetime:
+        return t + dt.timedelta(seconds=self.seconds)
+
+    def __eq__(self, other):
+        return isinstance(other, Interval) and other.seconds == self.seconds
+
+    def __repr__(self):
+        return f'Interval({self.seconds}s)'
+
+
+class CronExpression:
+    """Minimal 5-field cron expression: minute, hour, day of month, month, day of week.
+
+    Fields support `*`, numbers, ranges `a-b`, steps `*/n`, `a-b/n` and `a/n`,
+    and comma-separated lists of those. Day of week is 0-7, with both 0 and 7
+    meaning Sunday. As in cron, when both day fields are restricted, a day
+    matching either of them counts.
+    """
+
+    FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+    def __init__(self, expr: str):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError(f'Cron expression must have 5 fields: {expr!r}')
+        self.expr = expr
+        self.minutes, self.hours, self.days, self.months, weekdays = (
+            _parse_field(part, lo, hi) for part, (lo, hi) in zip(parts, self.FIELDS))
+        self.weekdays = {d % 7 for d in weekdays}
+        self.any_day = parts[2].startswith('*')
+        self.any_weekday = parts[4].startswith('*')
+
+    def _day_matches(self, day: dt.date) -> bool:
+        in_days = day.day in self.days
+        in_weekdays = day.isoweekday() % 7 in self.weekdays
+        if self.any_day or self.any_weekday:
+            return in_days and in_weekdays
+        return in_days or in_weekdays
+
+    def next_after(self, t: dt.datetime) -> dt.datetime:
+        """First matching minute strictly after `t`."""
+        t = t.replace(second=0, microsecond=0) + dt.timedelta(minutes=1)
+        day = t.date()
+        # Long enough to reach any valid date, e.g. Feb 29 on a given weekday
+        for _ in range(366 * 28):
+            if day.month in self.months and self._day_matches(day):
+                for hour in self.hours:
+                    for minute in self.minutes:
+                        candidate = t.replace(year=day.year, month=day.month, day=day.day, hour=hour, minute=minute)
+                        if candidate >= t:
+                            return candidate
+            day += dt.timedelta(days=1)
+        raise ValueError(f'Cron expression never matches: {self.expr!r}')
+
+    def __eq__(self, other):
+        return isinstance(other, CronExpression) and other.expr == self.expr
+
+    def __repr__(self):
+        return f'CronExpression({self.expr!r})'
+
+
+def _parse_field(field: str, lo: int, hi: int) -> list[int]:
+    values = set()
+    for part in field.split(','):
+        value_range, _, step = part.partition('/')
+        step = int(step) if step else 1
+        if value_range == '*':
+            start, end = lo, hi
+        elif '-' in value_range:
+            start, end = map(int, value_range.split('-', 1))
+        else:
+            start = int(value_range)
+            end = hi if part != value_range else start
+        if not lo <= start <= end <= hi or step < 1:
+            raise ValueError(f'Invalid cron field {field!r}, allowed values are {lo}-{hi}')
+        values.update(range(start, end + 1, step))
+    return sorted(values)
+
+
+def create(every: str | float | None = None, cron: str | None = None) -> Interval | CronExpression:
+    """Schedule from config: exactly one of `every` (duration) and `cron`."""
+    if (every is None) == (cron is None):
+        raise ValueError('Schedule needs exactly one of `every` and `cron`')
+    return Interval(parse_duration(every)) if every is not None else CronExpression(cron)
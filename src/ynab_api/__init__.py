@@ -4,6 +4,11 @@ from model.transaction import YnabTransaction
 from collections import namedtuple
 from collections.abc import Iterable
 from functools import partial
+import threading
+import time
+from .metadata import MetadataStore
+from utils.rate_limit import TokenBucket
+from utils import profiling
 
 class YnabAccountNotFound(Exception):
     def __init__(self, account_name):
@@ -16,41 +21,118 @@ class YnabBudgetNotFound(Exception):
         self.budget_name = budget_name
 
 class YnabApiWrapper:
+    Budget = namedtuple('Budget', 'id name')
     Account = namedtuple('Account', 'id name transfer_payee_id')
     Category = namedtuple('Category', 'id group_name name')
 
-    def __init__(self, token):
+    # YNAB allows 200 requests per rolling hour per access token
+    REQUESTS_PER_HOUR = 200
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # A creating POST may have been saved despite a 5xx answer; retrying it
+    # would duplicate transactions, so it is only retried when throttled.
+    CREATE_RETRY_STATUSES = {429}
+
+    def __init__(self, token, cache_dir=None, retries=5):
         configuration = ynab.Configuration()
         configuration.access_token = token
 
         self.__client = ynab.ApiClient(configuration)
+        self.__limiter = TokenBucket(self.REQUESTS_PER_HOUR, 3600)
+        self.__retries = retries
+        self.__store = MetadataStore(cache_dir, token) if cache_dir else None
 
+        self.__lock = threading.RLock()
         self.__budgets = None
         self.__accounts = {}
+        self.__accounts_by_name = {}
         self.__categories = {}
+        self.__category_ids_by_name = {}
+        # (section, budget_id) to sync again on next use, see refresh
+        self.__stale: set[tuple[str, str]] = set()
+
+    def _call(self, fn, *args, retry_statuses=RETRY_STATUSES, **kwargs):
+        """Call an API method within the rate limit, retrying with exponential
+        backoff on `retry_statuses` (by default throttling and server errors)."""
+        for attempt in range(self.__retries + 1):
+            self.__limiter.acquire()
+            try:
+                with profiling.timed('http', 'ynab'):
+                    return fn(*args, **kwargs)
+            except ynab.ApiException as e:
+                if e.status not in retry_statuses or attempt == self.__retries:
+                    raise
+                try:
+                    delay = float((e.headers or {}).get('Retry-After'))
+                except (TypeError, ValueError):
+                    delay = 2 ** attempt
+                print(f'YNAB API: HTTP {e.status}, retrying in {delay:.0f}s')
+                time.sleep(delay)
 
     @property
     def budgets(self):
-        if self.__budgets is None:
-            budgets_api = ynab.BudgetsApi(self.__client)
-            budgets_response = budgets_api.get_budgets()
-            self.__budgets = budgets_response.data.budgets
-        return self.__budgets
+        with self.__lock:
+            if self.__budgets is None:
+                cached = self.__store.load_budgets() if self.__store else None
+                if cached is not None:
+                    self.__budgets = [self.Budget(**b) for b in cached]
+                else:
+                    self.__fetch_budgets()
+            return self.__budgets
+
+    def __fetch_budgets(self):
+        budgets_api = ynab.BudgetsApi(self.__client)
+        budgets_response = self._call(budgets_api.get_budgets)
+        self.__budgets = [self.Budget(id=b.id, name=b.name) for b in budgets_response.data.budgets]
+        if self.__store:
+            self.__store.save_budgets([b._asdict() for b in self.__budgets])
 
     def get_budget_by_name(self, name):
         for b in self.budgets:
             if b.name == name:
                 return b
+        if self.__store:
+            # The cached budget list may be stale
+            with self.__lock:
+                self.__fetch_budgets()
+            for b in self.__budgets:
+                if b.name == name:
+                    return b
         raise YnabBudgetNotFound(name)
 
     def _ensure_accounts(self, budget_id):
-        if budget_id not in self.__accounts:
-            accounts_api = ynab.AccountsApi(self.__client)
-            self.__accounts[budget_id] = {
-                a.id: self.Account(id=a.id, name=a.name, transfer_payee_id=a.transfer_payee_id)
-                for a in accounts_api.get_accounts(budget_id).data.accounts
-            }
-        return self.__accounts[budget_id]
+        with self.__lock:
+            if budget_id not in self.__accounts or ('accounts', budget_id) in self.__stale:
+                cached = self.__store.load_budget(budget_id) if self.__store else {}
+                section = cached.get('accounts', {})
+                accounts = section.get('items', {})
+                accounts_api = ynab.AccountsApi(self.__client)
+                response = self._call(
+                    accounts_api.get_accounts, budget_id, last_knowledge_of_server=section.get('server_knowledge'))
+                for a in response.data.accounts:
+                    if a.deleted:
+                        accounts.pop(a.id, None)
+                    else:
+                        accounts[a.id] = {'name': a.name, 'transfer_payee_id': a.transfer_payee_id}
+                if self.__store:
+                    cached['accounts'] = {
+                        'server_knowledge': response.data.server_knowledge, 'items': accounts}
+                    self.__store.save_budget(budget_id, cached)
+                self.__accounts[budget_id] = {
+                    id: self.Account(id=id, **a) for id, a in accounts.items()
+                }
+                by_name = {}
+                for acc in self.__accounts[budget_id].values():
+                    by_name.setdefault(acc.name, acc)
+                self.__accounts_by_name[budget_id] = by_name
+                self.__stale.discard(('accounts', budget_id))
+            return self.__accounts[budget_id]
+
+    def refresh(self):
+        """Sync accounts and categories again on their next use, by delta when
+        they are cached. Until then lookups keep using the current metadata."""
+        with self.__lock:
+            self.__stale = ({('accounts', b) for b in self.__accounts}
+                            | {('categories', b) for b in self.__categories})
 
     def get_accounts(self, budget_id):
         return self._ensure_accounts(budget_id)
@@ -60,39 +142,73 @@ class YnabApiWrapper:
         return self._ensure_accounts(budget_id).get(account_id)
 
     def _ensure_categories(self, budget_id):
-        if budget_id not in self.__categories:
-            categories_api = ynab.CategoriesApi(self.__client)
-            cats = {}
-            for g in categories_api.get_categories(budget_id).data.category_groups:
-                for c in g.categories:
-                    cats[c.id] = self.Category(id=c.id, group_name=g.name, name=c.name)
-            self.__categories[budget_id] = cats
-        return self.__categories[budget_id]
+        with self.__lock:
+            if budget_id not in self.__categories or ('categories', budget_id) in self.__stale:
+                cached = self.__store.load_budget(budget_id) if self.__store else {}
+                section = cached.get('categories', {})
+                groups = section.get('groups', {})
+                categories = section.get('items', {})
+                categories_api = ynab.CategoriesApi(self.__client)
+                response = self._call(
+                    categories_api.get_categories, budget_id, last_knowledge_of_server=section.get('server_knowledge'))
+                # A delta contains changed groups, each with its changed categories only
+                for g in response.data.category_groups:
+                    if g.deleted:
+                        groups.pop(g.id, None)
+                        categories = {id: c for id, c in categories.items() if c['group_id'] != g.id}
+                        continue
+                    groups[g.id] = g.name
+                    for c in g.categories:
+                        if c.deleted:
+                            categories.pop(c.id, None)
+                        else:
+                            categories[c.id] = {'group_id': g.id, 'name': c.name}
+                if self.__store:
+                    cached['categories'] = {
+                        'server_knowledge': response.data.server_knowledge,
+                        'groups': groups, 'items': categories}
+                    self.__store.save_budget(budget_id, cached)
+                self.__categories[budget_id] = {
+                    id: self.Category(id=id, group_name=groups.get(c['group_id']), name=c['name'])
+                    for id, c in categories.items()
+                }
+                by_name = {}
+                for cat in self.__categories[budget_id].values():
+                    by_name.setdefault((cat.group_name, cat.name), cat.id)
+                self.__category_ids_by_name[budget_id] = by_name
+                self.__stale.discard(('categories', budget_id))
+            return self.__categories[budget_id]
 
     def get_category_by_id(self, budget_id, category_id):
         """Look up a category by its ID. Returns Category(id, group_name, name) or None."""
         return self._ensure_categories(budget_id).get(category_id)
 
     def get_category_id_by_name(self, budget_id, category_group_name, category_name):
-        for cat in self._ensure_categories(budget_id).values():
-            if cat.group_name == category_group_name and cat.name == category_name:
-                return cat.id
-        return None
+        self._ensure_categories(budget_id)
+        return self.__category_ids_by_name[budget_id].get((category_group_name, category_name))
+
+    def get_category_ids_by_names(self, budget_id, names: Iterable[tuple[str, str]]) -> dict[tuple[str, str], str | None]:
+        """Resolve a batch of (group_name, name) pairs. Unknown categories map to None."""
+        self._ensure_categories(budget_id)
+        index = self.__category_ids_by_name[budget_id]
+        return {n: index.get(n) for n in names}
 
     def get_account_by_name(self, budget_id, account_name):
         """Look up an account by name. Returns Account(id, name, transfer_payee_id)."""
-        for acc in self._ensure_accounts(budget_id).values():
-            if acc.name == account_name:
-                return acc
-        raise YnabAccountNotFound(account_name)
+        self._ensure_accounts(budget_id)
+        try:
+            return self.__accounts_by_name[budget_id][account_name]
+        except KeyError:
+            raise YnabAccountNotFound(account_name) from None
 
     def create_transactions(self, budget_id, transactions: Iterable[YnabTransaction]):
         data = [self.__to_new_transaction(t) for t in transactions]
         if not data:
             return None
         transactions_api = ynab.TransactionsApi(self.__client)
-        response = transactions_api.create_transaction(
-            budget_id, ynab.PostTransactionsWrapper(transactions=data))
+        response = self._call(
+            transactions_api.create_transaction, budget_id, ynab.PostTransactionsWrapper(transactions=data),
+            retry_statuses=self.CREATE_RETRY_STATUSES)
         return response.data
 
     def update_transactions(self, budget_id, transactions: Iterable[YnabTransaction]):
@@ -100,20 +216,20 @@ class YnabApiWrapper:
         if not data:
             return None
         transactions_api = ynab.TransactionsApi(self.__client)
-        response = transactions_api.update_transactions(
-            budget_id, ynab.PatchTransactionsWrapper(transactions=data))
+        response = self._call(
+            transactions_api.update_transactions, budget_id, ynab.PatchTransactionsWrapper(transactions=data))
         # TODO: fix _response_types_map in transactions_api.update_transactions()
         return response.data
 
     def get_transactions(self, budget_id) -> list[YnabTransaction]:
         transactions_api = ynab.TransactionsApi(self.__client)
-        response = transactions_api.get_transactions(budget_id)
+        response = self._call(transactions_api.get_transactions, budget_id)
         return [YnabTransaction(detail=t) for t in response.data.transactions]
 
     def get_transactions_by_account(self, budget_id, account_name, since_date) -> list[YnabTransaction]:
         transactions_api = ynab.TransactionsApi(self.__client)
-        response = transactions_api.get_transactions_by_account(
-            budget_id, self.get_account_by_name(budget_id, account_name).id, since_date)
+        response = self._call(
+            transactions_api.get_transactions_by_account, budget_id, self.get_account_by_name(budget_id, account_name).id, since_date)
         return [YnabTransaction(detail=t) for t in response.data.transactions]
 
     @staticmethod
@@ -150,6 +266,9 @@ class SingleBudgetYnabApiWrapper:
     def get_category_id_by_name(self, category_group_name, category_name):
         return self.ynab_api.get_category_id_by_name(self.budget.id, category_group_name, category_name)
 
+    def get_category_ids_by_names(self, names: Iterable[tuple[str, str]]) -> dict[tuple[str, str], str | None]:
+        return self.ynab_api.get_category_ids_by_names(self.budget.id, names)
+
     def create_transactions(self, transactions: Iterable[YnabTransaction]):
         return self.ynab_api.create_transactions(self.budget.id, transactions)
 
@@ -161,3 +280,38 @@ class SingleBudgetYnabApiWrapper:
 
     def get_transactions_by_account(self, account_name, since_date) -> list[YnabTransaction]:
         return self.ynab_api.get_transactions_by_account(self.budget.id, account_name, since_date)
+
+class YnabApiPool:
+    """Registry of API wrappers shared by all pipeline steps and sources.
+    Holds a single wrapper (HTTP client and metadata cache) per token."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.__lock = threading.Lock()
+        self.__wrappers: dict[str, YnabApiWrapper] = {}
+        self.__budget_wrappers: dict[tuple[str, str], SingleBudgetYnabApiWrapper] = {}
+
+    def get(self, token) -> YnabApiWrapper:
+        with self.__lock:
+            if token not in self.__wrappers:
+                self.__wrappers[token] = YnabApiWrapper(token, self.cache_dir)
+            return self.__wrappers[token]
+
+    def refresh(self):
+        """Sync metadata of all wrappers again on next use (see YnabApiWrapper.refresh)."""
+        with self.__lock:
+            wrappers = list(self.__wrappers.values())
+        for wrapper in wrappers:
+            wrapper.refresh()
+
+    def get_budget(self, budget) -> SingleBudgetYnabApiWrapper:
+        """Wrapper bound to a budget. Accepts anything with `token` and `budget_name`."""
+        key = (budget.token, budget.budget_name)
+        with self.__lock:
+            if key in self.__budget_wrappers:
+                return self.__budget_wrappers[key]
+        # Resolving the budget may hit the network: do it outside of the lock.
+        # Concurrent callers may both resolve it, the first one is kept.
+        budget_wrapper = SingleBudgetYnabApiWrapper(self.get(budget.token), budget.budget_name)
+        with self.__lock:
+            return self.__budget_wrappers.setdefault(key, budget_wrapper)
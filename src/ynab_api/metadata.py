@@ -0,0 +1,48 @@
+"""On-disk store of YNAB budget metadata (budgets, accounts, categories).
+
+Accounts and categories are kept together with YNAB's `server_knowledge`,
+so that subsequent runs only request the delta since the last sync.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+
+class MetadataStore:
+    """JSON files under `<cache_dir>/ynab`: one with the budget list per token
+    and one per budget with accounts and categories."""
+
+    def __init__(self, cache_dir: str, token: str):
+        self.path = Path(cache_dir) / 'ynab'
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.__token_key = hashlib.sha256(token.encode()).hexdigest()[:16]
+
+    def load_budgets(self) -> list[dict] | None:
+        return self.__load(f'budgets-{self.__token_key}.json')
+
+    def save_budgets(self, budgets: list[dict]):
+        self.__save(f'budgets-{self.__token_key}.json', budgets)
+
+    def load_budget(self, budget_id: str) -> dict:
+        """Cached metadata of a budget: `{'accounts': {...}, 'categories': {...}}`.
+        Each section holds `server_knowledge` and the merged entities."""
+        return self.__load(f'{budget_id}.json') or {}
+
+    def save_budget(self, budget_id: str, data: dict):
+        self.__save(f'{budget_id}.json', data)
+
+    def __load(self, name):
+        try:
+            with open(self.path / name) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def __save(self, name, data):
+        # Write to a temp file first so that an interrupted run never leaves a broken cache
+        tmp = self.path / f'{name}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path / name)
@@ -0,0 +1,57 @@
+import itertools
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+# Modules import each other absolutely from src, as when running src/main.py
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'src'))
+
+
+# Pipeline steps shared by the pipeline engine tests
+
+def source(items):
+    def step(stream):
+        yield from items
+    return step
+
+
+def endless(stream):
+    yield from itertools.count()
+
+
+def double(stream):
+    for x in stream:
+        yield x * 2
+
+
+def slow(delay):
+    def step(stream):
+        for x in stream:
+            time.sleep(delay)
+            yield x
+    return step
+
+
+def fail_on(value, error):
+    def step(stream):
+        for x in stream:
+            if x == value:
+                raise error
+            yield x
+    return step
+
+
+def take(n):
+    def step(stream):
+        yield from itertools.islice(stream, n)
+    return step
+
+
+@pytest.fixture
+def no_leaked_threads():
+    before = threading.active_count()
+    yield
+    assert threading.active_count() == before
@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+import threading
+import time
+
+import pytest
+
+from conftest import double, fail_on, slow, source, take
+from pipeline.pipeline import AsyncPipeline
+from sources.bank_api import aread_all
+from utils.profiling import Profiler
+
+pytestmark = pytest.mark.usefixtures('no_leaked_threads')
+
+
+def async_source(items):
+    def step(stream):
+        raise AssertionError('async pipelines must use the aio variant')
+
+    async def aio_step(stream):
+        for x in items:
+            await asyncio.sleep(0)
+            yield x
+
+    step.aio = aio_step
+    return step
+
+
+def async_double():
+    def step(stream):
+        raise AssertionError('async pipelines must use the aio variant')
+
+    async def aio_step(stream):
+        async for x in stream:
+            yield x * 2
+
+    step.aio = aio_step
+    return step
+
+
+def test_keeps_order_across_sync_and_async_steps():
+    steps = [async_source(range(50)), slow(0.001), async_double(), double]
+    assert AsyncPipeline(steps, queue_size=4).run() == [x * 4 for x in range(50)]
+
+
+def test_sync_only_steps():
+    assert AsyncPipeline([source(range(10)), double]).run() == [x * 2 for x in range(10)]
+
+
+def test_error_in_a_sync_step_is_raised():
+    with pytest.raises(ValueError, match='boom'):
+        AsyncPipeline([async_source(itertools.count()), fail_on(5, ValueError('boom')), double],
+                      queue_size=2).run()
+
+
+def test_error_in_an_async_step_is_raised():
+    def step(stream):
+        raise AssertionError('unused')
+
+    async def failing(stream):
+        async for x in stream:
+            if x == 3:
+                raise KeyError('async')
+            yield x
+
+    step.aio = failing
+    with pytest.raises(KeyError):
+        AsyncPipeline([source(itertools.count()), step, double], queue_size=2).run()
+
+
+def test_sync_step_may_stop_early():
+    assert AsyncPipeline([async_source(itertools.count()), take(3)], queue_size=2).run() == [0, 1, 2]
+
+
+def test_async_step_may_stop_early():
+    def step(stream):
+        raise AssertionError('unused')
+
+    async def first_two(stream):
+        async for x in stream:
+            yield x
+            if x == 2:
+                return
+
+    step.aio = first_two
+    assert AsyncPipeline([source(itertools.count()), double, step], queue_size=2).run() == [0, 2]
+
+
+def test_profiled_async_step_keeps_its_aio_variant():
+    profiler = Profiler()
+    step = profiler.instrument('double', async_double())
+    assert AsyncPipeline([source(range(5)), step]).run() == [0, 2, 4, 6, 8]
+    assert (profiler.steps[0].items_in, profiler.steps[0].items_out) == (5, 5)
+
+
+class FakeSource:
+    def __init__(self, accounts, delay):
+        self.accounts = accounts
+        self.delay = delay
+        self.lock = threading.Lock()
+        self.running = self.peak = 0
+
+    def fetch(self, account):
+        with self.lock:
+            self.running += 1
+            self.peak = max(self.peak, self.running)
+        time.sleep(self.delay)
+        with self.lock:
+            self.running -= 1
+        return [account]
+
+    def convert(self, account, raw_trans):
+        return raw_trans
+
+
+@pytest.mark.parametrize('max_workers', [1, 2])
+def test_aread_all_limits_concurrent_fetches(max_workers):
+    src = FakeSource(list(range(6)), delay=0.01)
+
+    async def read():
+        return [t async for t in aread_all([src], max_workers=max_workers)]
+
+    assert asyncio.run(read()) == list(range(6))
+    assert src.peak == max_workers
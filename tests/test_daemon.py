@@ -0,0 +1,93 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from daemon import Daemon
+from utils import schedule
+
+
+@pytest.fixture
+def config_dir(tmp_path):
+    (tmp_path / 'config.yaml').write_text(
+        'sources: {}\n'
+        'budgets: {}\n'
+        'pipelines:\n'
+        f'  hourly: {tmp_path / "hourly.yaml"}\n'
+        f'  nightly: {tmp_path / "nightly.yaml"}\n')
+    (tmp_path / 'hourly.yaml').write_text('schedule:\n  every: 1h\nsteps: []\n')
+    (tmp_path / 'nightly.yaml').write_text('schedule:\n  cron: "0 3 * * *"\nsteps: []\n')
+    return tmp_path
+
+
+@pytest.fixture
+def daemon(config_dir):
+    daemon = Daemon(str(config_dir / 'config.yaml'))
+    yield daemon
+    daemon.executor.shutdown(wait=True)
+
+
+def rewrite(path, text):
+    path.write_text(text)
+    # Make sure the change is noticed on file systems with coarse mtimes
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+
+def test_interval_pipelines_run_at_start_cron_ones_wait(daemon):
+    before = datetime.now()
+    daemon.reload()
+    assert daemon.pipelines['hourly'].next_run <= datetime.now()
+    assert daemon.pipelines['nightly'].next_run == schedule.CronExpression('0 3 * * *').next_after(before)
+
+
+def test_running_pipeline_is_skipped_when_due_again(daemon, monkeypatch):
+    started = []
+    release = threading.Event()
+
+    def run_pipeline(name, cfg, ctx):
+        started.append(name)
+        assert release.wait(timeout=5)
+        return True
+
+    monkeypatch.setattr(Daemon, 'run_pipeline', staticmethod(run_pipeline))
+    daemon.reload()
+    now = datetime.now()
+    daemon.run_due(now)
+    first = daemon.running['hourly']
+
+    # Due again while the first run is still going: skipped, next run planned
+    later = now + timedelta(hours=1, seconds=1)
+    daemon.run_due(later)
+    assert daemon.running['hourly'] is first
+    assert daemon.pipelines['hourly'].next_run == later + timedelta(hours=1)
+
+    release.set()
+    first.result(timeout=5)
+    daemon.run_due(later + timedelta(hours=1))
+    daemon.running['hourly'].result(timeout=5)
+    assert started == ['hourly', 'hourly']
+
+
+def test_invalid_pipeline_file_keeps_the_previous_version(daemon, config_dir):
+    daemon.reload()
+    previous = daemon.pipelines['hourly']
+
+    rewrite(config_dir / 'hourly.yaml', 'schedule:\n  every: soon\nsteps: []\n')
+    daemon.reload()
+    assert daemon.pipelines['hourly'] is previous
+
+    rewrite(config_dir / 'hourly.yaml', 'schedule:\n  every: 2h\nsteps: []\n')
+    daemon.reload()
+    assert daemon.pipelines['hourly'].schedule == schedule.Interval(7200)
+
+
+def test_invalid_config_keeps_the_previous_context(daemon, config_dir):
+    daemon.reload()
+    ctx = daemon.ctx
+
+    rewrite(config_dir / 'config.yaml', 'pipelines: [not, a, mapping]\n')
+    daemon.reload()
+    assert daemon.ctx is ctx
+    assert set(daemon.pipelines) == {'hourly', 'nightly'}
@@ -0,0 +1,78 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from bank_api.data_source.fs import FilesystemBankApi, FilesystemBankApiEngine
+from bank_api.data_source.parse_cache import ParsedDocumentCache
+from model.configuration import BankAccountConfiguration, BankApiConfiguration, BankApiName
+
+
+class SlowCsvEngine(FilesystemBankApiEngine):
+    glob_pattern = '*.csv'
+
+    def __init__(self):
+        self.parsed = []
+        self.lock = threading.Lock()
+
+    def parse_document(self, f):
+        with self.lock:
+            self.parsed.append(f)
+        time.sleep(0.2)
+        return pd.read_csv(f)
+
+    def to_columns(self, df):
+        return pd.DataFrame({'time': pd.to_datetime(df.time), 'amount': df.amount})
+
+
+def create_api(tmp_path, cache=True):
+    conf = BankApiConfiguration(
+        type=BankApiName.PUMB, name='csv', token=str(tmp_path / 'documents'), n_retries=0,
+        remove_cancelled_statements=False, cache_dir=str(tmp_path / 'cache') if cache else None,
+        accounts=[BankAccountConfiguration('main', 'csv', 'UA1', None)])
+    return FilesystemBankApi(conf, SlowCsvEngine())
+
+
+def write_documents(tmp_path, n):
+    documents = tmp_path / 'documents' / 'UA1'
+    documents.mkdir(parents=True)
+    files = []
+    for i in range(n):
+        f = documents / f'{i}.csv'
+        f.write_text(f'time,amount\n2026-01-{i + 1:02} 10:00,-{i + 1}\n')
+        files.append(f)
+    return files
+
+
+def test_concurrent_runs_parse_a_document_once(tmp_path):
+    files = write_documents(tmp_path, 3)
+    api = create_api(tmp_path)
+    with ThreadPoolExecutor(4) as executor:
+        results = list(executor.map(lambda _: api._parse_documents(files), range(4)))
+    assert sorted(api.engine.parsed) == files
+    for dfs in results:
+        assert [int(df.amount.iloc[0]) for df in dfs] == [-1, -2, -3]
+
+
+def test_failed_parse_is_raised_to_waiting_runs(tmp_path):
+    files = write_documents(tmp_path, 1)
+    files[0].write_text('not,a\n"csv')
+    api = create_api(tmp_path, cache=False)
+    with ThreadPoolExecutor(2) as executor:
+        futures = [executor.submit(api._parse_documents, files) for _ in range(2)]
+    assert all(f.exception() is not None for f in futures)
+    # Nothing is left in flight: the document is parsed again on the next run
+    files[0].write_text('time,amount\n2026-01-01 10:00,-1\n')
+    assert int(api._parse_documents(files)[0].amount.iloc[0]) == -1
+
+
+def test_cache_entries_written_concurrently(tmp_path):
+    f, = write_documents(tmp_path, 1)
+    cache = ParsedDocumentCache(str(tmp_path / 'cache'), SlowCsvEngine())
+    df = pd.read_csv(f)
+    with ThreadPoolExecutor(8) as executor:
+        for result in [executor.submit(cache.put, f, df) for _ in range(32)]:
+            result.result()
+    assert cache.get(f).equals(df)
+    assert not list(cache.path.glob('*.tmp'))
@@ -0,0 +1,97 @@
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from bank_api.data_source.mono import Api
+from bank_api.data_source.mono.scheduler import StatementScheduler
+from model.configuration import BankAccountConfiguration, BankApiConfiguration, BankApiName
+
+INTERVAL = 0.5
+
+
+class FakeClient:
+    MAX_PERIOD = timedelta(days=31)
+
+    def __init__(self, ibans):
+        self.ibans = ibans
+        self.calls = []
+        self.lock = threading.Lock()
+        # Cleared to hold requests in flight
+        self.release = threading.Event()
+        self.release.set()
+
+    def request_client_info(self):
+        return {'accounts': [{'iban': iban, 'id': f'id-{iban}'} for iban in self.ibans]}
+
+    def request_statements_for_time_range(self, account_id, start, end):
+        with self.lock:
+            self.calls.append((account_id, time.monotonic()))
+        assert self.release.wait(timeout=5)
+        t = int(start.timestamp()) + 60
+        return [
+            {'id': f'{t}-buy', 'time': t, 'amount': -100, 'mcc': 0, 'description': 'Shop'},
+            {'id': f'{t}-cancel', 'time': t + 1, 'amount': 100, 'mcc': 0, 'description': 'Скасування. Shop'},
+            {'id': f'{t}-coffee', 'time': t + 2, 'amount': -50, 'mcc': 0, 'description': 'Cafe'},
+        ]
+
+
+def create_api(ibans):
+    client = FakeClient(ibans)
+
+    class FakeApi(Api):
+        @staticmethod
+        def _create_client(conf):
+            return client
+
+    conf = BankApiConfiguration(
+        type=BankApiName.MONO, name='mono', token=str(uuid.uuid4()), n_retries=0,
+        remove_cancelled_statements=True, request_interval=INTERVAL,
+        accounts=[BankAccountConfiguration(iban, 'mono', iban, None) for iban in ibans])
+    return FakeApi(conf), client
+
+
+def test_accounts_of_different_tokens_are_fetched_concurrently():
+    apis = [create_api(['UA1', 'UA2']), create_api(['UA3', 'UA4'])]
+    end = datetime.now().astimezone()
+    start = end - timedelta(days=1)
+
+    t0 = time.monotonic()
+    # As BankApiSource.request_all does: request all accounts before reading any
+    requested = [api.request_statements_for_time_range(iban, start, end)
+                 for api, client in apis for iban in client.ibans]
+    assert time.monotonic() - t0 < INTERVAL / 2
+    results = [list(statements) for statements in requested]
+    elapsed = time.monotonic() - t0
+
+    # Two requests per token, one interval apart; the tokens overlap
+    assert INTERVAL <= elapsed < 2 * INTERVAL
+    for api, client in apis:
+        assert len(client.calls) == 2
+    # Cancelled purchases are still removed
+    assert [[t.description for t in r] for r in results] == [['Cafe']] * 4
+
+
+def test_concurrent_requests_share_a_fetch():
+    api, client = create_api(['UA1'])
+    end = datetime.now().astimezone()
+    start = end - timedelta(days=1)
+
+    client.release.clear()
+    first = api.request_statements_for_time_range('UA1', start, end)
+    second = api.request_statements_for_time_range('UA1', start, end)
+    # Overlaps the first request: only the day before it is fetched again
+    wider = api.request_statements_for_time_range('UA1', start - timedelta(days=1), end)
+    client.release.set()
+
+    assert [t.description for t in first] == ['Cafe']
+    assert [t.description for t in second] == ['Cafe']
+    assert [t.description for t in wider] == ['Cafe', 'Cafe']
+    assert len(client.calls) == 2
+
+
+def test_scheduler_takes_the_current_interval():
+    token = str(uuid.uuid4())
+    scheduler = StatementScheduler.for_token(token, 60)
+    assert StatementScheduler.for_token(token, 10) is scheduler
+    assert scheduler.interval == 10
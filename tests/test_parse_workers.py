@@ -0,0 +1,76 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / 'src'
+
+# Shaped like main.py: a script whose pipeline parses documents in worker processes
+SCRIPT = '''
+import sys
+sys.path.insert(0, {src!r})
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from bank_api.data_source.fs import FilesystemBankApi, FilesystemBankApiEngine
+from model.configuration import BankAccountConfiguration, BankApiConfiguration, BankApiName
+
+
+class CsvEngine(FilesystemBankApiEngine):
+    glob_pattern = '*.csv'
+
+    def parse_document(self, f):
+        return pd.read_csv(f)
+
+    def to_columns(self, df):
+        return pd.DataFrame({{'time': pd.to_datetime(df.time), 'amount': df.amount * 100,
+                              'description': df.description}})
+
+
+def main():
+    root = Path(sys.argv[1])
+    conf = BankApiConfiguration(
+        type=BankApiName.PUMB, name='csv', token=str(root), n_retries=0,
+        remove_cancelled_statements=False, parse_workers=2,
+        accounts=[BankAccountConfiguration('main', 'csv', 'UA1', None)])
+    end = datetime(2026, 2, 1).astimezone()
+    for t in FilesystemBankApi(conf, CsvEngine()).request_statements_for_time_range(
+            'UA1', end - timedelta(days=60), end):
+        print(t.description, t.amount)
+
+
+if __name__ == '__main__':
+    main()
+'''
+
+
+def test_parse_workers_from_a_script(tmp_path):
+    documents = tmp_path / 'documents' / 'UA1'
+    documents.mkdir(parents=True)
+    for month in (1, 12):
+        year = 2026 if month == 1 else 2025
+        (documents / f'{month}.csv').write_text(
+            f'time,amount,description\n{year}-{month:02}-15 10:00,-5,shop {month}\n')
+    script = tmp_path / 'script.py'
+    script.write_text(SCRIPT.format(src=str(SRC)))
+
+    result = subprocess.run([sys.executable, str(script), str(tmp_path / 'documents')],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    # The spawned workers import the script too, but only the parent runs main()
+    assert sorted(l for l in result.stdout.splitlines() if l.startswith('shop')) == ['shop 1 -500', 'shop 12 -500']
+
+
+def test_main_does_nothing_when_imported_by_a_worker():
+    # Spawned workers import the main script as __mp_main__
+    code = textwrap.dedent(f'''
+        import runpy, sys
+        sys.path.insert(0, {str(SRC)!r})
+        sys.argv = ['main.py', '--no-such-option']
+        runpy.run_path({str(SRC / 'main.py')!r}, run_name='__mp_main__')
+    ''')
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ''
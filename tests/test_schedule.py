@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import pytest
+
+from utils.schedule import CronExpression, Interval, create, parse_duration
+
+
+def next_runs(expr, start, n):
+    cron = CronExpression(expr)
+    runs = []
+    for _ in range(n):
+        start = cron.next_after(start)
+        runs.append(start)
+    return runs
+
+
+@pytest.mark.parametrize('value, seconds', [
+    (90, 90.0), (1.5, 1.5), ('90', 90.0), ('90s', 90.0), ('15m', 900.0), (' 1.5h ', 5400.0), ('1d', 86400.0),
+])
+def test_parse_duration(value, seconds):
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize('value', ['', 'm', '15 min', '-5m', '1w'])
+def test_parse_duration_rejects_invalid(value):
+    with pytest.raises(ValueError):
+        parse_duration(value)
+
+
+def test_interval_counts_from_the_previous_run():
+    assert Interval(90).next_after(datetime(2026, 1, 1, 10, 0, 30)) == datetime(2026, 1, 1, 10, 2)
+    with pytest.raises(ValueError):
+        Interval(0)
+
+
+def test_every_quarter_hour():
+    assert next_runs('*/15 * * * *', datetime(2026, 1, 1, 10, 7, 42), 4) == [
+        datetime(2026, 1, 1, 10, 15), datetime(2026, 1, 1, 10, 30),
+        datetime(2026, 1, 1, 10, 45), datetime(2026, 1, 1, 11, 0)]
+
+
+def test_next_run_is_strictly_after():
+    assert CronExpression('30 9 * * *').next_after(datetime(2026, 1, 1, 9, 30)) == datetime(2026, 1, 2, 9, 30)
+    assert CronExpression('30 9 * * *').next_after(datetime(2026, 1, 1, 9, 29, 59)) == datetime(2026, 1, 1, 9, 30)
+
+
+def test_weekday_range():
+    # 2026-01-02 is a Friday
+    assert next_runs('0 8 * * 1-5', datetime(2026, 1, 2, 9, 0), 2) == [
+        datetime(2026, 1, 5, 8, 0), datetime(2026, 1, 6, 8, 0)]
+
+
+def test_seven_is_sunday():
+    assert CronExpression('0 0 * * 7').next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4)
+    assert CronExpression('0 0 * * 0').next_after(datetime(2026, 1, 1)) == datetime(2026, 1, 4)
+
+
+def test_restricted_day_fields_match_either():
+    # The 13th or any Friday
+    assert next_runs('0 0 13 * 5', datetime(2026, 1, 8), 3) == [
+        datetime(2026, 1, 9), datetime(2026, 1, 13), datetime(2026, 1, 16)]
+
+
+def test_day_of_month_with_any_weekday():
+    assert CronExpression('0 0 13 * *').next_after(datetime(2026, 1, 8)) == datetime(2026, 1, 13)
+
+
+def test_february_29():
+    assert CronExpression('0 12 29 2 *').next_after(datetime(2026, 1, 1)) == datetime(2028, 2, 29, 12, 0)
+
+
+def test_start_with_step():
+    assert CronExpression('5/20 * * * *').minutes == [5, 25, 45]
+    assert CronExpression('10-30/10 * * * *').minutes == [10, 20, 30]
+    assert CronExpression('1,5-6 * * * *').minutes == [1, 5, 6]
+
+
+@pytest.mark.parametrize('expr', [
+    '* * * *', '* * * * * *', '60 * * * *', '* 24 * * *', '* * 0 * *', '* * * 13 *', '* * * * 8',
+    '5-1 * * * *', '*/0 * * * *', 'x * * * *',
+])
+def test_invalid_expressions(expr):
+    with pytest.raises(ValueError):
+        CronExpression(expr)
+
+
+def test_expression_that_never_matches():
+    with pytest.raises(ValueError, match='never matches'):
+        CronExpression('0 0 31 2 *').next_after(datetime(2026, 1, 1))
+
+
+def test_create():
+    assert create(every='15m') == Interval(900)
+    assert create(cron='0 * * * *') == CronExpression('0 * * * *')
+    for every, cron in [(None, None), ('15m', '0 * * * *')]:
+        with pytest.raises(ValueError):
+            create(every, cron)
@@ -0,0 +1,58 @@
+from bank_api.data_source.mono.store import StatementStore
+
+DAY = 24 * 3600
+NOW = 100 * DAY
+
+
+def statement(id, time):
+    return {'id': id, 'time': time, 'amount': -100, 'description': id}
+
+
+def test_everything_is_a_gap_initially():
+    store = StatementStore(':memory:', settled_seconds=DAY)
+    assert store.gaps('acc', 0, NOW, NOW) == [(0, NOW)]
+
+
+def test_only_settled_part_is_covered():
+    store = StatementStore(':memory:', settled_seconds=DAY)
+    store.add('acc', 0, NOW, [], fetched_at=NOW)
+    assert store.gaps('acc', 0, NOW, NOW) == [(NOW - DAY, NOW)]
+
+
+def test_gaps_between_covered_intervals():
+    store = StatementStore(':memory:', settled_seconds=0)
+    store.add('acc', 10, 20, [], fetched_at=NOW)
+    store.add('acc', 30, 40, [], fetched_at=NOW)
+    assert store.gaps('acc', 0, 50, NOW) == [(0, 10), (20, 30), (40, 50)]
+    assert store.gaps('acc', 12, 18, NOW) == []
+    assert store.gaps('other', 12, 18, NOW) == [(12, 18)]
+
+
+def test_adjacent_and_overlapping_coverage_is_merged():
+    store = StatementStore(':memory:', settled_seconds=0)
+    store.add('acc', 10, 20, [], fetched_at=NOW)
+    store.add('acc', 20, 30, [], fetched_at=NOW)
+    store.add('acc', 5, 12, [], fetched_at=NOW)
+    assert store.gaps('acc', 0, 40, NOW) == [(0, 5), (30, 40)]
+
+
+def test_add_replaces_statements_of_the_interval():
+    store = StatementStore(':memory:', settled_seconds=0)
+    store.add('acc', 0, 100, [statement('a', 10), statement('b', 50)], fetched_at=NOW)
+    # 'b' was cancelled: a refetch of its interval no longer returns it
+    store.add('acc', 40, 100, [statement('c', 60)], fetched_at=NOW)
+    assert [s['id'] for s in store.statements('acc', 0, 100)] == ['a', 'c']
+
+
+def test_statements_are_limited_to_the_range_and_sorted():
+    store = StatementStore(':memory:', settled_seconds=0)
+    store.add('acc', 0, 100, [statement('late', 90), statement('early', 5), statement('mid', 50)], fetched_at=NOW)
+    assert [s['id'] for s in store.statements('acc', 0, 60)] == ['early', 'mid']
+
+
+def test_recent_fetch_is_reused_within_the_reuse_window():
+    store = StatementStore(':memory:', settled_seconds=DAY, reuse_seconds=300)
+    store.add('acc', 0, NOW, [], fetched_at=NOW)
+    # The unsettled tail is reused, and extended past the fetch time, for reuse_seconds
+    assert store.gaps('acc', 0, NOW + 100, NOW + 100) == []
+    assert store.gaps('acc', 0, NOW + 400, NOW + 400) == [(NOW - DAY, NOW + 400)]
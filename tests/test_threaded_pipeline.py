@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from conftest import double, endless, fail_on, slow, source, take
+from pipeline.pipeline import ThreadedPipeline
+
+pytestmark = pytest.mark.usefixtures('no_leaked_threads')
+
+
+def test_keeps_order():
+    steps = [source(range(100)), slow(0.001), double, slow(0.002)]
+    assert ThreadedPipeline(steps, queue_size=4).run() == [x * 2 for x in range(100)]
+
+
+def test_collect_false_drains_the_stream():
+    seen = []
+
+    def record(stream):
+        for x in stream:
+            seen.append(x)
+            yield x
+
+    assert ThreadedPipeline([source(range(10)), record]).run(collect=False) is None
+    assert seen == list(range(10))
+
+
+def test_steps_overlap():
+    first_item_mapped = threading.Event()
+
+    def reader(stream):
+        yield 1
+        # A serial pipeline would never map the first item before reading the rest
+        assert first_item_mapped.wait(timeout=5)
+        yield 2
+
+    def mapper(stream):
+        for x in stream:
+            first_item_mapped.set()
+            yield x
+
+    assert ThreadedPipeline([reader, mapper]).run() == [1, 2]
+
+
+def test_error_in_a_middle_step_is_raised_and_stops_upstream():
+    with pytest.raises(ValueError, match='boom'):
+        ThreadedPipeline([endless, fail_on(5, ValueError('boom')), double], queue_size=2).run()
+
+
+def test_error_in_the_last_step_is_raised():
+    with pytest.raises(KeyError):
+        ThreadedPipeline([endless, double, fail_on(10, KeyError('sink'))], queue_size=2).run()
+
+
+def test_downstream_may_stop_early():
+    assert ThreadedPipeline([endless, double, take(3)], queue_size=2).run() == [0, 2, 4]